@@ -0,0 +1,135 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+SAFE_ASYNC_METHODS = ('get', 'head')
+
+
+class AsyncReadMixin:
+    '''Миксин асинхронных действий чтения для представлений DRF.
+
+    При включенной настройке ASYNC_VIEWS (запуск через ASGI) as_view
+    возвращает асинхронное представление: GET и HEAD обрабатываются
+    действием с префиксом a (alist, aretrieve, aget), выборка данных
+    идет через асинхронный ORM. Аутентификация, права, фильтры и
+    сериализаторы остаются синхронным кодом DRF и выполняются в потоке
+    через sync_to_async. Остальные методы и действия без асинхронного
+    варианта обрабатываются обычным синхронным представлением.
+    '''
+
+    @classonlymethod
+    def as_view(cls, *args, **initkwargs):
+        sync_view = super().as_view(*args, **initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return sync_view
+        actions = getattr(sync_view, 'actions', None)
+        run_sync_view = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            method = request.method.lower()
+            action = 'get' if method == 'head' else method
+            if actions is not None:
+                action = actions.get(action)
+            handler_name = 'a{}'.format(action)
+            if method not in SAFE_ASYNC_METHODS or not hasattr(
+                cls, handler_name
+            ):
+                return await run_sync_view(request, *args, **kwargs)
+            self = cls(**sync_view.initkwargs)
+            if actions is not None:
+                self.action_map = {**actions, 'head': action}
+            return await self.adispatch(
+                request, handler_name, *args, **kwargs
+            )
+
+        view.__dict__.update(
+            (name, value) for name, value in sync_view.__dict__.items()
+            if name != '__wrapped__'
+        )
+        return view
+
+    async def adispatch(self, request, handler_name, *args, **kwargs):
+        '''Аналог APIView.dispatch для асинхронного действия.'''
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await getattr(self, handler_name)(
+                request, *args, **kwargs
+            )
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def afilter_queryset(self):
+        '''Метод получения отфильтрованного queryset.
+
+        Фильтры выполняются в потоке: django-filter проверяет значения
+        параметров по БД.
+        '''
+        return await sync_to_async(
+            lambda: self.filter_queryset(self.get_queryset())
+        )()
+
+    async def aserialize(self, instance, many=False):
+        '''Метод сериализации объектов в потоке.'''
+        return await sync_to_async(
+            lambda: self.get_serializer(instance, many=many).data
+        )()
+
+    async def apaginate_queryset(self, queryset):
+        '''Метод выборки страницы пагинатором.
+
+        Пагинаторы без асинхронной выборки выполняются в потоке.
+        '''
+        if self.paginator is None:
+            return None
+        apaginate_queryset = getattr(
+            self.paginator, 'apaginate_queryset', None
+        )
+        if apaginate_queryset is None:
+            return await sync_to_async(self.paginator.paginate_queryset)(
+                queryset, self.request, view=self
+            )
+        return await apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        '''Асинхронный аналог get_object.'''
+        queryset = await self.afilter_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist, TypeError, ValueError,
+            ValidationError
+        ):
+            raise Http404
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        '''Асинхронный аналог list.'''
+        queryset = await self.afilter_queryset()
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                await self.aserialize(page, many=True)
+            )
+        return Response(await self.aserialize(
+            [obj async for obj in queryset], many=True
+        ))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        '''Асинхронный аналог retrieve.'''
+        return Response(await self.aserialize(await self.aget_object()))
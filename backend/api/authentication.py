@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+def get_token_version_key(key):
+    '''Метод получения ключа поколения токена в общем кэше.'''
+    return f'auth_token_version:{key}'
+
+
+class TokenUserCache:
+    '''Локальный для процесса LRU-кэш токен -> (токен, пользователь).
+
+    Запись живет не дольше TOKEN_CACHE_TIMEOUT секунд, размер кэша
+    ограничен TOKEN_CACHE_SIZE записями. Вместе с записью хранится
+    поколение токена из общего кэша, прочитанное до запроса к БД: при
+    выходе, смене пароля или деактивации поколение увеличивается после
+    коммита, и записи во всех процессах перестают быть действительными.
+    Поколение хранится не дольше самих записей, поэтому запросы с
+    несуществующими токенами не засоряют общий кэш. Отзыв работает
+    только с общим для процессов кэшем (проверка api.E001), без него
+    TOKEN_CACHE_TIMEOUT по умолчанию равен 0 и кэш выключен.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_version(self, key):
+        '''Метод получения текущего поколения токена.'''
+        return cache.get(get_token_version_key(key), 0)
+
+    def get(self, key):
+        '''Метод получения действительной записи по токену.'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, version, expires = entry
+            if time.monotonic() > expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if version != self.get_version(key):
+            self.evict(key)
+            return None
+        return token
+
+    def set(self, key, token, version):
+        '''Метод сохранения записи.'''
+        timeout = settings.TOKEN_CACHE_TIMEOUT
+        if timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (token, version, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def evict(self, key):
+        '''Метод удаления записи в текущем процессе.'''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, key):
+        '''Метод сброса записи по токену во всех процессах.'''
+        cache.set(
+            get_token_version_key(key), time.time_ns(),
+            timeout=settings.TOKEN_CACHE_TIMEOUT
+        )
+        self.evict(key)
+
+    def clear(self):
+        '''Метод полной очистки кэша текущего процесса.'''
+        with self._lock:
+            self._entries.clear()
+
+
+token_user_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''Аутентификация по токену с кэшированием пользователя.
+
+    При попадании в кэш запросов к БД не выполняется. Каждый запрос
+    получает свою копию пользователя, чтобы изменения атрибутов в
+    одном запросе не попадали в другие. Копия может быть старше
+    TOKEN_CACHE_TIMEOUT секунд, поэтому CustomUser.save не записывает
+    счетчики при полном сохранении.
+    '''
+
+    def authenticate_credentials(self, key):
+        '''Метод получения пользователя по токену.'''
+        token = token_user_cache.get(key)
+        if token is None:
+            version = token_user_cache.get_version(key)
+            token = self.get_model().objects.select_related(
+                'user'
+            ).filter(key=key).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            token_user_cache.set(key, token, version)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'User inactive or deleted.'
+            )
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
@@ -0,0 +1,203 @@
+import hashlib
+import time
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.db.router import primary_reads
+from .renderers import dumps
+
+CATALOG_VERSION_KEY = 'catalog_version'
+RECIPES_VERSION_KEY = 'recipes_version'
+
+
+def get_version(key):
+    '''Метод получения текущего поколения кэша.'''
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+async def aget_version(key):
+    '''Асинхронный метод получения текущего поколения кэша.'''
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        await cache.aadd(key, version, timeout=None)
+        version = await cache.aget(key, version)
+    return version
+
+
+def bump_version(key):
+    '''Метод сброса кэша увеличением поколения.'''
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_catalog_version():
+    '''Метод сброса кэша справочников.'''
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_recipes_version():
+    '''Метод сброса кэша страниц рецептов.'''
+    bump_version(RECIPES_VERSION_KEY)
+
+
+class VersionedCacheMixin:
+    '''Миксин кэширования ответов list/retrieve по поколению кэша.
+
+    Данные ответа хранятся в кэше Django под ключом из поколения
+    version_key и сигнатуры запроса, поэтому попадание в кэш не
+    обращается к ORM и сериализатору. Ответы несут строгий ETag, по
+    If-None-Match возвращается 304. Ответ для кэша строится по
+    основной БД, а не по реплике, чтобы отстающая реплика не сохранила
+    старые данные под новым поколением. Если get_cache_signature вернул
+    None или таймаут равен 0, запрос обрабатывается без кэша. Для
+    асинхронных действий (alist, aretrieve) кэш читается через
+    асинхронное API кэша Django.
+    '''
+
+    version_key = None
+    cache_timeout_setting = None
+
+    def get_cache_signature(self, request, *args, **kwargs):
+        '''Метод получения сигнатуры запроса для ключа кэша.'''
+        return request.get_full_path()
+
+    def get_cache_key(self, request, version, signature):
+        '''Метод получения ключа кэша ответа.'''
+        return '{}:{}:{}:{}'.format(
+            self.version_key, version, request.get_host(), signature
+        )
+
+    def make_cache_entry(self, response):
+        '''Метод подготовки данных ответа и ETag для кэша.'''
+        body = dumps(response.data, orjson.OPT_SORT_KEYS)
+        return response.data, '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+    def make_cached_response(self, request, cached):
+        '''Метод формирования ответа из кэша с учетом If-None-Match.'''
+        data, etag = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
+    def get_cached_response(self, request, action, *args, **kwargs):
+        '''Метод получения ответа из кэша или его формирования.'''
+        timeout = getattr(settings, self.cache_timeout_setting)
+        signature = self.get_cache_signature(request, *args, **kwargs)
+        if not timeout or signature is None:
+            return action(request, *args, **kwargs)
+
+        key = self.get_cache_key(
+            request, get_version(self.version_key), signature
+        )
+        cached = cache.get(key)
+        if cached is None:
+            with primary_reads():
+                response = action(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = self.make_cache_entry(response)
+            cache.set(key, cached, timeout)
+        return self.make_cached_response(request, cached)
+
+    async def aget_cached_response(self, request, action, *args, **kwargs):
+        '''Асинхронный аналог get_cached_response.'''
+        timeout = getattr(settings, self.cache_timeout_setting)
+        signature = self.get_cache_signature(request, *args, **kwargs)
+        if not timeout or signature is None:
+            return await action(request, *args, **kwargs)
+
+        key = self.get_cache_key(
+            request, await aget_version(self.version_key), signature
+        )
+        cached = await cache.aget(key)
+        if cached is None:
+            with primary_reads():
+                response = await action(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = self.make_cache_entry(response)
+            await cache.aset(key, cached, timeout)
+        return self.make_cached_response(request, cached)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aget_cached_response(
+            request, super().alist, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aget_cached_response(
+            request, super().aretrieve, *args, **kwargs
+        )
+
+
+class CatalogCacheMixin(VersionedCacheMixin):
+    '''Миксин кэширования ответов справочников (теги, ингредиенты).'''
+
+    version_key = CATALOG_VERSION_KEY
+    cache_timeout_setting = 'CATALOG_CACHE_TIMEOUT'
+
+
+class RecipePageCacheMixin(VersionedCacheMixin):
+    '''Миксин кэширования страниц рецептов для анонимных юзеров.
+
+    Ключ строится по нормализованным параметрам tags, author, page,
+    limit и выборочным полям fields и omit (их значения делятся по
+    запятым); запросы с другими параметрами и запросы авторизованных
+    юзеров не кэшируются.
+    '''
+
+    version_key = RECIPES_VERSION_KEY
+    cache_timeout_setting = 'RECIPE_PAGE_CACHE_TIMEOUT'
+    cache_params = ('tags', 'author', 'page', 'limit', 'fields', 'omit')
+    comma_params = ('fields', 'omit')
+
+    def get_param_values(self, params, name):
+        '''Метод получения значений параметра запроса.'''
+        values = params.getlist(name)
+        if name in self.comma_params:
+            values = [
+                value for item in values for value in item.split(',')
+            ]
+        return values
+
+    def get_cache_signature(self, request, *args, **kwargs):
+        '''Метод получения нормализованной сигнатуры фильтров.'''
+        if request.user.is_authenticated:
+            return None
+        params = request.query_params
+        if set(params) - set(self.cache_params):
+            return None
+        signature = '&'.join(
+            '{}={}'.format(name, ','.join(sorted(set(
+                self.get_param_values(params, name)
+            ))))
+            for name in self.cache_params if name in params
+        )
+        return '{}?{}'.format(kwargs.get('pk', 'list'), signature)
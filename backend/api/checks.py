@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+VERSIONED_CACHE_SETTINGS = (
+    'CATALOG_CACHE_TIMEOUT', 'RECIPE_PAGE_CACHE_TIMEOUT',
+    'TOKEN_CACHE_TIMEOUT'
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    '''Проверка общего для всех процессов кэша.
+
+    Поколения кэша ответов и токенов хранятся в кэше Django: с
+    локальным для процесса бэкендом сброс в одном процессе не виден
+    остальным, и они отдают устаревшие данные (или принимают отозванный
+    токен) до истечения таймаута.
+    '''
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    enabled = [
+        name for name in VERSIONED_CACHE_SETTINGS if getattr(settings, name)
+    ]
+    if not enabled:
+        return []
+    return [Error(
+        'Кэширование ({}) требует общего для процессов кэша, а '
+        'CACHE_BACKEND локален для процесса.'.format(', '.join(enabled)),
+        hint='Задайте CACHE_BACKEND (Redis или Memcached) или обнулите '
+             'таймауты.',
+        id='api.E001',
+    )]
@@ -0,0 +1,413 @@
+import csv
+import threading
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from reportlab.pdfbase.ttfonts import (
+    FF_NONSYMBOLIC, FF_SYMBOLIC, SUBSETN, TTFontFace, makeToUnicodeCMap
+)
+from rest_framework.renderers import BaseRenderer
+
+from recipes.constants import EXPORT_CHUNK_SIZE
+from .renderers import dumps
+
+
+def format_amount(amount):
+    '''Метод форматирования количества без лишних нулей для CSV и PDF.'''
+    if amount % 1:
+        return '{:f}'.format(amount.normalize())
+    return str(int(amount))
+
+
+font_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_font_face(path):
+    '''Метод получения разобранного шрифта TrueType.'''
+    return TTFontFace(path)
+
+
+class TextWriter:
+    '''Построчная запись списка покупок в текст.
+
+    Формат совпадает с прежней выгрузкой: строки через перевод строки
+    без завершающего, количество выводится как есть (1045.00).
+    '''
+
+    def __init__(self):
+        self.separator = b''
+
+    def start(self):
+        return b''
+
+    def write(self, row):
+        name, measurement_unit, amount = row
+        chunk = self.separator + '{} ({}) — {}'.format(
+            name, measurement_unit, amount
+        ).encode()
+        self.separator = b'\n'
+        return chunk
+
+    def finish(self):
+        return b''
+
+
+class Echo:
+    '''Псевдобуфер для csv.writer, возвращающий записанную строку.'''
+
+    def write(self, value):
+        return value
+
+
+class CSVWriter:
+    '''Построчная запись списка покупок в CSV.
+
+    Файл начинается с BOM, чтобы Excel открыл кириллицу в UTF-8.
+    '''
+
+    header = ('Ингредиент', 'Единица измерения', 'Количество')
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def start(self):
+        return ('\ufeff' + self.writer.writerow(self.header)).encode()
+
+    def write(self, row):
+        name, measurement_unit, amount = row
+        return self.writer.writerow(
+            (name, measurement_unit, format_amount(amount))
+        ).encode()
+
+    def finish(self):
+        return b''
+
+
+class JSONWriter:
+    '''Поэлементная запись списка покупок в JSON-массив.'''
+
+    def __init__(self):
+        self.separator = b''
+
+    def start(self):
+        return b'['
+
+    def write(self, row):
+        name, measurement_unit, amount = row
+        chunk = self.separator + dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': int(amount) if not amount % 1 else float(amount),
+        })
+        self.separator = b','
+        return chunk
+
+    def finish(self):
+        return b']'
+
+
+class PDFWriter:
+    '''Постраничная запись списка покупок в PDF.
+
+    Страница выводится, как только набраны ее строки; в памяти
+    хранятся только строки текущей страницы, назначенные коды символов
+    и смещения объектов для таблицы xref. Шрифт PDF_FONT_PATH (по
+    умолчанию DejaVu Sans) встраивается в конце файла подмножествами
+    по 256 использованных символов, метрики и подмножества строит
+    reportlab. ToUnicode позволяет копировать и искать текст.
+    '''
+
+    page_width = 595
+    page_height = 842
+    margin = 50
+    font_size = 11
+    title_size = 16
+    leading = 15
+    title = 'Список покупок'
+
+    catalog_id = 1
+    pages_id = 2
+    resources_id = 3
+
+    def __init__(self):
+        self.face = get_font_face(settings.PDF_FONT_PATH)
+        self.offset = 0
+        self.offsets = {}
+        self.next_id = self.resources_id + 1
+        self.page_ids = []
+        self.lines = []
+        self.subsets = [[0]]
+        self.codes = {}
+        self.lines_per_page = int(
+            (self.page_height - 2 * self.margin) / self.leading
+        ) - 1
+
+    def write_object(self, body):
+        '''Метод записи объекта PDF с учетом его смещения.'''
+        object_id = self.next_id
+        self.next_id += 1
+        return self.write_object_id(object_id, body)
+
+    def write_object_id(self, object_id, body):
+        '''Метод записи объекта PDF с заданным номером.'''
+        self.offsets[object_id] = self.offset
+        data = b'%d 0 obj\n%s\nendobj\n' % (object_id, body)
+        self.offset += len(data)
+        return data
+
+    def get_stream(self, data, extra=b''):
+        '''Метод получения тела сжатого объекта-потока.'''
+        data = zlib.compress(data)
+        return (
+            b'<< /Length %d /Filter /FlateDecode%s >>\n'
+            b'stream\n%s\nendstream'
+        ) % (len(data), extra, data)
+
+    def get_width(self, text, size):
+        '''Метод получения ширины текста в пунктах.'''
+        return sum(
+            self.face.getCharWidth(ord(char)) for char in text
+        ) * size / 1000
+
+    def show(self, text, size):
+        '''Метод кодирования текста в операторы вывода.
+
+        Каждому новому символу назначается код в текущем подмножестве
+        шрифта, подмножества выводятся как шрифты /F0, /F1 и т. д.
+        '''
+        runs = []
+        for char in text:
+            code = self.codes.get(char)
+            if code is None:
+                if len(self.subsets[-1]) == 256:
+                    self.subsets.append([0])
+                subset = self.subsets[-1]
+                code = self.codes[char] = (
+                    len(self.subsets) - 1, len(subset)
+                )
+                subset.append(ord(char))
+            if runs and runs[-1][0] == code[0]:
+                runs[-1][1].append(code[1])
+            else:
+                runs.append((code[0], bytearray([code[1]])))
+        return b' '.join(
+            b'/F%d %d Tf <%s> Tj' % (subset, size, codes.hex().encode())
+            for subset, codes in runs
+        )
+
+    def get_text(self, x, y, text, size):
+        '''Метод получения текстового блока в заданной точке.'''
+        return b'BT %.2f %.2f Td %s ET' % (x, y, self.show(text, size))
+
+    def get_line(self, row, top):
+        '''Метод получения строки ингредиента с отточием до количества.'''
+        name, measurement_unit, amount = row
+        right = self.page_width - self.margin
+        quantity = '{} {}'.format(format_amount(amount), measurement_unit)
+        quantity_width = self.get_width(quantity, self.font_size)
+        space = self.get_width(' ', self.font_size)
+        width = right - self.margin - quantity_width - 2 * space
+        if self.get_width(name, self.font_size) > width:
+            while name and self.get_width(name + '…', self.font_size) > width:
+                name = name[:-1]
+            name += '…'
+        dots = int(
+            (width - self.get_width(name, self.font_size))
+            / self.get_width('.', self.font_size)
+        )
+        return self.get_text(
+            self.margin, top, '{} {}'.format(name, '.' * dots),
+            self.font_size
+        ) + b'\n' + self.get_text(
+            right - quantity_width, top, quantity, self.font_size
+        )
+
+    def write_page(self):
+        '''Метод вывода накопленных строк страницей PDF.'''
+        number = len(self.page_ids) + 1
+        top = self.page_height - self.margin
+        content = [self.get_text(
+            self.margin, self.margin - self.leading,
+            'Стр. {}'.format(number), self.font_size
+        )]
+        if number == 1:
+            content.append(self.get_text(
+                self.margin, top, self.title, self.title_size
+            ))
+            top -= 2 * self.leading
+        for row in self.lines:
+            content.append(self.get_line(row, top))
+            top -= self.leading
+        self.lines = []
+        data = self.write_object(self.get_stream(b'\n'.join(content)))
+        page_id = self.next_id
+        self.page_ids.append(page_id)
+        return data + self.write_object(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources %d 0 R /Contents %d 0 R >>' % (
+                self.pages_id, self.page_width, self.page_height,
+                self.resources_id, page_id - 1
+            )
+        )
+
+    def write_font(self, number, subset):
+        '''Метод записи подмножества шрифта с дескриптором и ToUnicode.'''
+        face = self.face
+        name = SUBSETN(number) + b'+' + face.name
+        with font_lock:
+            font_file = face.makeSubset(subset)
+        data = self.write_object(self.get_stream(
+            font_file, b' /Length1 %d' % len(font_file)
+        ))
+        data += self.write_object(self.get_stream(
+            makeToUnicodeCMap(name.decode(), subset).encode()
+        ))
+        data += self.write_object(
+            b'<< /Type /FontDescriptor /FontName /%s /Flags %d '
+            b'/FontBBox [%s] /ItalicAngle %g /Ascent %g /Descent %g '
+            b'/CapHeight %g /StemV %g /FontFile2 %d 0 R >>' % (
+                name, face.flags & ~FF_NONSYMBOLIC | FF_SYMBOLIC,
+                b' '.join(b'%g' % value for value in face.bbox),
+                face.italicAngle, face.ascent, face.descent,
+                face.capHeight, face.stemV, self.next_id - 2
+            )
+        )
+        return data + self.write_object(
+            b'<< /Type /Font /Subtype /TrueType /BaseFont /%s '
+            b'/FirstChar 0 /LastChar %d /Widths [%s] '
+            b'/FontDescriptor %d 0 R /ToUnicode %d 0 R >>' % (
+                name, len(subset) - 1,
+                b' '.join(
+                    b'%g' % face.getCharWidth(code) for code in subset
+                ),
+                self.next_id - 1, self.next_id - 2
+            )
+        )
+
+    def start(self):
+        header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offset = len(header)
+        return header + self.write_object_id(
+            self.catalog_id,
+            b'<< /Type /Catalog /Pages %d 0 R >>' % self.pages_id
+        )
+
+    def write(self, row):
+        self.lines.append(row)
+        limit = self.lines_per_page - (2 if not self.page_ids else 0)
+        if len(self.lines) >= limit:
+            return self.write_page()
+        return b''
+
+    def finish(self):
+        data = b''
+        if self.lines or not self.page_ids:
+            data += self.write_page()
+        fonts = []
+        for number, subset in enumerate(self.subsets):
+            data += self.write_font(number, subset)
+            fonts.append(b'/F%d %d 0 R' % (number, self.next_id - 1))
+        data += self.write_object_id(
+            self.resources_id, b'<< /Font << %s >> >>' % b' '.join(fonts)
+        )
+        data += self.write_object_id(
+            self.pages_id,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids),
+                len(self.page_ids)
+            )
+        )
+        xref_offset = self.offset
+        data += b'xref\n0 %d\n0000000000 65535 f \n' % self.next_id
+        data += b''.join(
+            b'%010d 00000 n \n' % self.offsets[object_id]
+            for object_id in range(1, self.next_id)
+        )
+        return data + (
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (self.next_id, self.catalog_id, xref_offset)
+        )
+
+
+class ShoppingListRenderer(BaseRenderer):
+    '''Базовый рендерер потоковой выгрузки списка покупок.
+
+    Строки (name, measurement_unit, amount) читаются из итератора и
+    кодируются по одной через writer_class, ответ отдается частями по
+    EXPORT_CHUNK_SIZE байт, поэтому память не зависит от размера
+    списка.
+    '''
+
+    writer_class = None
+    extension = None
+
+    def get_filename(self):
+        '''Метод получения имени файла выгрузки.'''
+        return 'shopping_list.{}'.format(self.extension)
+
+    def stream(self, rows):
+        '''Метод потокового кодирования строк списка.'''
+        writer = self.writer_class()
+        buffer = bytearray(writer.start())
+        for row in rows:
+            buffer += writer.write(row)
+            if len(buffer) >= EXPORT_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += writer.finish()
+        yield bytes(buffer)
+
+    async def astream(self, rows):
+        '''Метод потокового кодирования строк асинхронного итератора.'''
+        writer = self.writer_class()
+        buffer = bytearray(writer.start())
+        async for row in rows:
+            buffer += writer.write(row)
+            if len(buffer) >= EXPORT_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += writer.finish()
+        yield bytes(buffer)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.stream(data or ()))
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    '''Выгрузка списка покупок в текст.'''
+
+    media_type = 'text/plain'
+    format = 'txt'
+    extension = 'txt'
+    writer_class = TextWriter
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    '''Выгрузка списка покупок в CSV.'''
+
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+    writer_class = CSVWriter
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    '''Выгрузка списка покупок в JSON.'''
+
+    media_type = 'application/json'
+    format = 'json'
+    extension = 'json'
+    writer_class = JSONWriter
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    '''Выгрузка списка покупок в PDF.'''
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    extension = 'pdf'
+    charset = None
+    render_style = 'binary'
+    writer_class = PDFWriter
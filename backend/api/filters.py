@@ -1,7 +1,9 @@
+from django.db.models import Exists, OuterRef
 from django_filters import filters, rest_framework
 from django_filters.rest_framework import FilterSet
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -15,23 +17,56 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    '''Фильтр для избранного и списка покупок.'''
+    '''Фильтр для избранного и списка покупок.
+
+    Теги, избранное и список покупок фильтруются через EXISTS, без
+    JOIN, поэтому рецепты не дублируются и не нужен DISTINCT.
+    '''
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug')
-    is_favorited = filters.NumberFilter(
-        method='common_filter',
-        field_name='favorites__user_id')
-    is_in_shopping_cart = filters.NumberFilter(
-        method='common_filter',
-        field_name='shopping_recipe__user_id')
+        to_field_name='slug',
+        method='tags_filter')
+    is_favorited = filters.NumberFilter(method='common_filter')
+    is_in_shopping_cart = filters.NumberFilter(method='common_filter')
+    search = filters.CharFilter(method='search_filter')
+
+    user_recipe_models = {
+        'is_favorited': Favorite,
+        'is_in_shopping_cart': ShoppingCart,
+    }
+
+    def tags_filter(self, queryset, name, value):
+        '''Метод фильтрации рецептов, у которых есть любой из тегов.'''
+        if not value:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=[tag.id for tag in value]
+            )
+        ))
 
     def common_filter(self, queryset, name, value):
+        if not value:
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(Exists(
+            self.user_recipe_models[name].objects.filter(
+                user=user, recipe_id=OuterRef('pk')
+            )
+        ))
+
+    def search_filter(self, queryset, name, value):
+        '''Метод полнотекстового поиска по названию и описанию.'''
+        value = value.strip()
         if value:
-            return queryset.filter(**{name: self.request.user})
+            return search_recipes(queryset, value)
         return queryset
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
@@ -0,0 +1,96 @@
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from foodgram.db.router import primary_reads
+from recipes.constants import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient
+from .cache import CATALOG_VERSION_KEY, aget_version, get_version
+
+
+class IngredientPrefixIndex:
+    '''Локальный для процесса индекс ингредиентов по префиксу названия.
+
+    Индекс строится лениво при первом поиске: отсортированный список
+    названий в casefold и параллельный список готовых ответов. Поиск
+    идет бинарным поиском без обращения к БД. Индекс помнит поколение
+    кэша справочников, при котором построен, и перестраивается, если
+    поколение сменилось (в том числе в другом процессе), поэтому ответ,
+    сохраненный в кэш под новым поколением, не строится по старому
+    индексу; по той же причине индекс читается с основной БД, а не с
+    реплики. Кроме того, индекс сбрасывается сигналами и
+    перестраивается не реже чем раз в INGREDIENT_INDEX_TTL секунд.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def invalidate(self):
+        '''Метод сброса индекса.'''
+        self._data = None
+
+    def _build(self, version):
+        '''Метод построения индекса из основной БД.'''
+        with primary_reads():
+            rows = sorted(
+                (name.casefold(), id, name, measurement_unit)
+                for id, name, measurement_unit
+                in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                )
+            )
+        keys = [row[0] for row in rows]
+        items = [
+            {'id': id, 'name': name, 'measurement_unit': measurement_unit}
+            for _, id, name, measurement_unit in rows
+        ]
+        return keys, items, time.monotonic(), version
+
+    def _is_fresh(self, data, version):
+        '''Метод проверки актуальности построенного индекса.'''
+        return data is not None and data[3] == version and (
+            time.monotonic() - data[2] <= settings.INGREDIENT_INDEX_TTL
+        )
+
+    def _load(self, version):
+        '''Метод получения индекса, актуального для поколения.'''
+        data = self._data
+        if not self._is_fresh(data, version):
+            with self._lock:
+                data = self._data
+                if not self._is_fresh(data, version):
+                    data = self._data = self._build(version)
+        return data[0], data[1]
+
+    def _search(self, keys, items, prefix, limit):
+        '''Метод бинарного поиска по построенному индексу.'''
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        result = []
+        for index in range(start, min(start + limit, len(keys))):
+            if not keys[index].startswith(prefix):
+                break
+            result.append(items[index])
+        return result
+
+    def search(self, prefix, limit=INGREDIENT_SEARCH_LIMIT):
+        '''Метод поиска ингредиентов по началу названия.'''
+        keys, items = self._load(get_version(CATALOG_VERSION_KEY))
+        return self._search(keys, items, prefix, limit)
+
+    async def asearch(self, prefix, limit=INGREDIENT_SEARCH_LIMIT):
+        '''Асинхронный метод поиска, индекс строится в потоке.'''
+        version = await aget_version(CATALOG_VERSION_KEY)
+        data = self._data
+        if self._is_fresh(data, version):
+            keys, items = data[0], data[1]
+        else:
+            keys, items = await sync_to_async(self._load)(version)
+        return self._search(keys, items, prefix, limit)
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+
+def percentile(values, percent):
+    '''Метод получения перцентиля отсортированной выборки.'''
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+class Command(BaseCommand):
+    '''Команда замера основных эндпоинтов через тестовый клиент DRF.
+
+    Запросы выполняются в процессе, без сети. Для каждого эндпоинта
+    считаются p50/p95 времени ответа и число SQL запросов, результат
+    пишется в JSON и может сравниваться с предыдущим прогоном. С
+    --concurrency дополнительно замеряется пропускная способность при
+    заданном числе параллельных клиентов, с --asgi запросы идут через
+    ASGI-обработчик (асинхронные вью включаются ASYNC_VIEWS=True).
+    '''
+    help = 'Бенчмарк основных эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON предыдущего прогона для сравнения.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help='Число параллельных клиентов для замера пропускной '
+                 'способности.'
+        )
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Выполнять запросы через ASGI-обработчик.'
+        )
+
+    def get_endpoints(self):
+        '''Метод формирования списка замеряемых эндпоинтов.'''
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if recipe is None or tag is None or ingredient is None:
+            raise CommandError(
+                'Нет данных для замера, выполните seed_benchmark_data.'
+            )
+        prefix = ingredient.name[:2]
+        return {
+            'recipe_list': '/api/recipes/',
+            'recipe_list_filtered': (
+                f'/api/recipes/?tags={tag.slug}&is_favorited=1'
+            ),
+            'recipe_list_cursor': '/api/recipes/?cursor=',
+            'recipe_detail': f'/api/recipes/{recipe.id}/',
+            'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+            'download_shopping_cart': '/api/recipes/download_shopping_cart/',
+            'ingredient_search': f'/api/ingredients/?name={prefix}',
+        }
+
+    def measure(self, client, url, iterations, warmup):
+        '''Метод замера одного эндпоинта.'''
+        for _ in range(warmup):
+            self.request(client, url)
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                status_code = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context.captured_queries))
+        timings.sort()
+        return {
+            'status': status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': max(queries),
+        }
+
+    def request(self, client, url):
+        '''Метод выполнения запроса с чтением всего тела ответа.'''
+        if self.asgi:
+            return async_to_sync(self.arequest)(client, url)
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    async def arequest(self, client, url):
+        '''Метод выполнения запроса через ASGI-обработчик.'''
+        response = await client.get(url, headers=self.headers)
+        if response.streaming and response.is_async:
+            async for _ in response.streaming_content:
+                pass
+        elif response.streaming:
+            # Без ASYNC_VIEWS выгрузка отдается синхронным потоком,
+            # который читает БД, поэтому он дочитывается в потоке.
+            await sync_to_async(b''.join)(response.streaming_content)
+        return response.status_code
+
+    def get_client(self):
+        '''Метод получения клиента для текущего режима.'''
+        if self.asgi:
+            return AsyncClient()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+        return client
+
+    def measure_throughput(self, url, total, concurrency):
+        '''Метод замера числа запросов в секунду при параллельной нагрузке.'''
+        start = time.perf_counter()
+        if self.asgi:
+            asyncio.run(self.arun_concurrently(url, total, concurrency))
+            return round(total / (time.perf_counter() - start), 1)
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, 'client'):
+                local.client = self.get_client()
+            self.request(local.client, url)
+            # Тестовый клиент не закрывает соединения в конце запроса,
+            # возвращаем их в пул, как это делает обработчик запросов.
+            close_old_connections()
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(one, range(total)))
+        return round(total / (time.perf_counter() - start), 1)
+
+    async def arun_concurrently(self, url, total, concurrency):
+        '''Метод выполнения запросов с concurrency одновременными.'''
+        semaphore = asyncio.Semaphore(concurrency)
+        client = self.get_client()
+
+        async def one():
+            async with semaphore:
+                await self.arequest(client, url)
+
+        await asyncio.gather(*(one() for _ in range(total)))
+
+    def count_connection(self, **kwargs):
+        '''Метод учета новых соединений с БД за время замера.'''
+        self.connects += 1
+
+    def handle(self, *args, **options):
+        '''Метод запуска бенчмарка.'''
+        self.connects = 0
+        connection_created.connect(self.count_connection)
+        user = CustomUser.objects.annotate(
+            carts=Count('shopping_user')
+        ).order_by('-carts', '-followers_count').first()
+        if user is None:
+            raise CommandError(
+                'Нет данных для замера, выполните seed_benchmark_data.'
+            )
+        self.asgi = options['asgi']
+        # Юзер передается токеном в заголовке в обоих режимах: у
+        # AsyncClient нет force_authenticate, а замеры должны совпадать.
+        self.headers = {'Authorization': 'Token {}'.format(
+            Token.objects.get_or_create(user=user)[0].key
+        )}
+        client = self.get_client()
+
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            results = {
+                name: self.measure(
+                    client, url, options['iterations'], options['warmup']
+                )
+                for name, url in self.get_endpoints().items()
+            }
+            if options['concurrency']:
+                for name, url in self.get_endpoints().items():
+                    results[name]['rps'] = self.measure_throughput(
+                        url, options['iterations'], options['concurrency']
+                    )
+
+        report = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        self.stdout.write(report)
+        self.stdout.write(f'db_connects: {self.connects}')
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            for name, result in results.items():
+                if name not in baseline:
+                    continue
+                before = baseline[name]
+                self.stdout.write(
+                    f'{name}: p50 {before["p50_ms"]} -> {result["p50_ms"]} '
+                    f'ms, p95 {before["p95_ms"]} -> {result["p95_ms"]} ms, '
+                    f'queries {before["queries"]} -> {result["queries"]}'
+                    + (
+                        f', rps {before["rps"]} -> {result["rps"]}'
+                        if 'rps' in before and 'rps' in result else ''
+                    )
+                )
@@ -0,0 +1,221 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('foodgram.timing')
+
+request_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    '''Метрики одного запроса.'''
+
+    def __init__(self):
+        self.queries = 0
+        self.connects = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        '''Обертка выполнения SQL для подсчета запросов и времени БД.'''
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def count_queries(execute, sql, params, many, context):
+    '''Обертка выполнения SQL, передающая запрос метрикам запроса.
+
+    Метрики берутся из контекстной переменной, поэтому запросы
+    учитываются и в потоках sync_to_async при запуске через ASGI.
+    '''
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    '''Метод подключения счетчика запросов к соединению с БД.'''
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def count_connection(connection, **kwargs):
+    '''Метод учета нового соединения с БД в метриках запроса.'''
+    metrics = request_metrics.get()
+    if metrics is not None:
+        metrics.connects += 1
+
+
+class TimedSerializerMixin:
+    '''Миксин учета времени сериализации ответа в метриках запроса.
+
+    Подключается к корневым сериализаторам ответов. Вложенные
+    сериализаторы с миксином не учитываются повторно.
+    '''
+
+    def to_representation(self, *args, **kwargs):
+        metrics = request_metrics.get()
+        if metrics is None:
+            return super().to_representation(*args, **kwargs)
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(*args, **kwargs)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += time.perf_counter() - start
+
+
+def get_view_name(request):
+    '''Метод получения имени вьюсета и действия по запросу.'''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    method = request.method.lower()
+    action = getattr(match.func, 'actions', {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestTimingMiddleware:
+    '''Middleware измерения количества SQL запросов и времени запроса.
+
+    Включается настройкой REQUEST_TIMING. Для каждого запроса пишет
+    заголовок Server-Timing и строку лога foodgram.timing с именем
+    вьюсета, числом запросов, временем БД, сериализации и всего вью,
+    а также числом открытых за запрос соединений с БД (0, если
+    соединение переиспользовано по CONN_MAX_AGE). Время
+    сериализации учитывают сериализаторы с TimedSerializerMixin.
+    В выключенном состоянии исключается из цепочки middleware.
+    Работает как в синхронной, так и в асинхронной цепочке.
+    '''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_counter)
+        connection_created.connect(count_connection)
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.add_metrics(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.add_metrics(request, response, metrics, start)
+
+    def add_metrics(self, request, response, metrics, start):
+        '''Метод записи метрик запроса в заголовок и лог.
+
+        Потоковый ответ выполняет запросы при отдаче тела, уже после
+        отправки заголовков, поэтому для него метрики пишутся только в
+        лог по окончании итерации.
+        '''
+        if response.streaming:
+            def finish():
+                self.log_metrics(request, response, metrics, start)
+
+            if response.is_async:
+                response.streaming_content = self.aiterate(
+                    response.streaming_content, metrics, finish
+                )
+            else:
+                response.streaming_content = self.iterate(
+                    response.streaming_content, metrics, finish
+                )
+            return response
+
+        view_time = self.log_metrics(request, response, metrics, start)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.queries} queries"',
+            f'serializer;dur={metrics.serializer_time * 1000:.2f}',
+            f'view;dur={view_time * 1000:.2f}',
+        ))
+        return response
+
+    def iterate(self, content, metrics, finish):
+        '''Метод отдачи потока с учетом запросов в метриках запроса.'''
+        iterator = iter(content)
+        try:
+            while True:
+                token = request_metrics.set(metrics)
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    request_metrics.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+    async def aiterate(self, content, metrics, finish):
+        '''Метод асинхронной отдачи потока с учетом запросов.'''
+        iterator = content.__aiter__()
+        try:
+            while True:
+                token = request_metrics.set(metrics)
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    request_metrics.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+    def log_metrics(self, request, response, metrics, start):
+        '''Метод записи метрик запроса в лог, возвращает время вью.'''
+        view_time = time.perf_counter() - start
+        logger.info(json.dumps({
+            'view': get_view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'view_ms': round(view_time * 1000, 2),
+            'db_connects': metrics.connects,
+        }))
+        return view_time
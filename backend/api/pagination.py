@@ -1,9 +1,96 @@
-from rest_framework.pagination import PageNumberPagination
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 from recipes.constants import PAGE_SIZE_PAGINATION
 
 
-class CustomPagination(PageNumberPagination):
+class AsyncPageNumberPagination(PageNumberPagination):
+    '''Постраничный пагинатор с асинхронной выборкой страницы.'''
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        '''Метод выборки страницы через асинхронный ORM.
+
+        Повторяет paginate_queryset, но COUNT и выборка страницы
+        выполняются асинхронно, а пагинатор Django получает готовое
+        число объектов и сам к БД не обращается.
+        '''
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.page.object_list = [
+            obj async for obj in self.page.object_list
+        ]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+
+class CustomPagination(AsyncPageNumberPagination):
     '''Кастомный пагинатор.'''
     page_size = PAGE_SIZE_PAGINATION
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    '''Курсорный пагинатор рецептов по индексу created.'''
+    page_size = PAGE_SIZE_PAGINATION
+    page_size_query_param = 'limit'
+    ordering = ('-created', '-id')
+
+
+class RecipePagination(CustomPagination):
+    '''Пагинатор рецептов с опциональным курсорным режимом.
+
+    По умолчанию работает постранично через page/limit. Если в запросе
+    передан параметр cursor (в том числе пустой для первой страницы),
+    выдача идет по курсору без COUNT и OFFSET.
+    '''
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''Метод выбора режима пагинации по параметрам запроса.'''
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        '''Метод асинхронного выбора режима пагинации.
+
+        Курсорный режим выполняется синхронным пагинатором в потоке.
+        '''
+        if self.cursor_query_param in request.query_params:
+            return await sync_to_async(self.paginate_queryset)(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        '''Метод формирования ответа в выбранном режиме.'''
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        '''Метод отрисовки пагинации в browsable API.'''
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
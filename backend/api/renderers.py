@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+encoder = JSONEncoder()
+
+
+def dumps(data, option=0):
+    '''Метод кодирования данных ответа в JSON через orjson.
+
+    Типы, которые orjson не знает (Decimal, ленивые строки, QuerySet),
+    приводятся энкодером DRF.
+    '''
+    return orjson.dumps(
+        data, default=encoder.default, option=option | orjson.OPT_NON_STR_KEYS
+    )
+
+
+class ORJSONRenderer(JSONRenderer):
+    '''JSON-рендерер на orjson.
+
+    Ответ кодируется сразу в bytes без промежуточной строки. Как и
+    JSONRenderer, отдает компактный UTF-8; отступ из заголовка Accept
+    (indent=...) заменяется отступом в 2 пробела - другого orjson не
+    поддерживает.
+    '''
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        option = 0
+        if self.get_indent(accepted_media_type, renderer_context):
+            option = orjson.OPT_INDENT_2
+        return dumps(data, option)
@@ -1,18 +1,29 @@
 import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.db import transaction
+from PIL import Image, UnidentifiedImageError
 
 from rest_framework import serializers
 from rest_framework.fields import CurrentUserDefault
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.validators import UniqueTogetherValidator
 
+from recipes.constants import (
+    BASE64_CHUNK_SIZE, BATCH_RECIPES_LIMIT, IMAGE_VARIANTS
+)
 from recipes.models import (
     Favorite, Ingredient, Recipe, RecipeIngredient,
     ShoppingCart, Subscription, Tag
 )
-from recipes.constants import LIMIT_RECIPES
+from recipes.shopping_list import apply_recipe_deltas
 from users.models import CustomUser
+from .cache import bump_recipes_version
+from .middleware import TimedSerializerMixin
+from .utils import get_recipes_limit
 from .validators import (
     validate_tags, validate_unique_ingredients,
     validate_unique_tags
@@ -20,19 +31,176 @@ from .validators import (
 
 
 class Base64ImageField(serializers.ImageField):
-    '''Кастомное поле для кодирования изображений.'''
+    '''Кастомное поле для кодирования изображений.
+
+    Принимает как строку data:image;base64, так и файл из multipart
+    запроса. Base64 декодируется частями во временный файл, размер и
+    количество пикселей проверяются до полного декодирования картинки.
+    '''
+
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+        'max_pixels': (
+            'Изображение не должно содержать больше {max_pixels} пикселей.'
+        ),
+    }
 
     def to_internal_value(self, data):
         '''Метод декодирования картинки.'''
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
+            data = self.decode_base64(data)
+        self.validate_limits(data)
         return super().to_internal_value(data)
 
+    def decode_base64(self, data):
+        '''Метод декодирования base64 во временный файл по частям.
+
+        Длина строки проверяется до декодирования (с запасом на переносы
+        строк через каждые 76 символов), точный размер - по мере записи.
+        Пробелы и переносы убираются в каждой части отдельно, неполная
+        группа из 4 символов переносится в следующую часть, поэтому
+        копия всей строки не создается.
+        '''
+        format, _, imgstr = data.partition(';base64,')
+        ext = format.split('/')[-1]
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        encoded_limit = (max_size + 2) // 3 * 4
+        if len(imgstr) > encoded_limit + encoded_limit // 76 * 2:
+            self.fail('max_size', max_size=max_size)
+
+        file = TemporaryUploadedFile(
+            'temp.' + ext, 'image/' + ext, 0, None
+        )
+        rest = ''
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                rest += ''.join(
+                    imgstr[start:start + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(rest) - len(rest) % 4
+                file.write(base64.b64decode(rest[:end]))
+                rest = rest[end:]
+                if file.tell() > max_size:
+                    file.close()
+                    self.fail('max_size', max_size=max_size)
+            if rest:
+                # Неполная группа в конце строки - b64decode сообщит
+                # об ошибке.
+                base64.b64decode(rest)
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_image')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def validate_limits(self, data):
+        '''Метод проверки размера и количества пикселей изображения.'''
+        if getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+        if not hasattr(data, 'seek'):
+            return
+        try:
+            with Image.open(data) as image:
+                width, height = image.size
+        except (UnidentifiedImageError, OSError):
+            return
+        finally:
+            data.seek(0)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.fail(
+                'max_pixels', max_pixels=settings.RECIPE_IMAGE_MAX_PIXELS
+            )
+
+
+class SparseFieldsetMixin:
+    '''Миксин выборочных полей ответа по параметрам fields и omit.
+
+    В безопасном запросе ?fields=id,name оставляет в ответе только
+    перечисленные поля Meta.fields, ?omit=text исключает поля. Лишние
+    поля отбрасываются до сериализации, поэтому их SerializerMethodField
+    не вычисляются. Действует только на корневой сериализатор ответа:
+    вложенные сериализаторы отдают все поля.
+    '''
+
+    sparse_params = ('fields', 'omit')
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        '''Метод получения набора запрошенных полей или None.'''
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        fields, omit = (
+            {
+                name.strip()
+                for value in request.query_params.getlist(param)
+                for name in value.split(',') if name.strip()
+            }
+            for param in cls.sparse_params
+        )
+        if not fields and not omit:
+            return None
+        unknown = (fields | omit) - set(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': 'Неизвестные поля: {}.'.format(
+                    ', '.join(sorted(unknown))
+                )
+            })
+        return (fields or set(cls.Meta.fields)) - omit
+
+    def get_fields(self):
+        '''Метод отбора полей корневого сериализатора по запросу.'''
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        requested = self.get_requested_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if name in requested
+        }
+
+
+class ImageVariantsField(serializers.Field):
+    '''Поле ссылок на уменьшенные копии фото рецепта.
+
+    Возвращает {вариант: {формат: url}} для thumbnail, card и full в
+    WebP и JPEG. Пока копии текущего фото не готовы, возвращает None,
+    и клиент показывает исходное фото.
+    '''
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        '''Метод получения ссылок на варианты фото.'''
+        variants = recipe.image_variants
+        if not recipe.image or not variants or (
+            variants.get('source') != recipe.image.name
+        ):
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for variant in IMAGE_VARIANTS:
+            urls[variant] = {}
+            for image_format, name in variants[variant].items():
+                url = default_storage.url(name)
+                urls[variant][image_format] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return urls
+
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     '''Сериализатор модели User.'''
 
     is_subscribed = serializers.SerializerMethodField()
@@ -47,6 +215,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         '''Метод проверки подписки юзера.'''
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
 
         request_user = self.context.get('request').user
         return (
@@ -55,7 +225,7 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Сериализатор модели Tag.'''
 
     class Meta:
@@ -63,7 +233,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'color', 'slug']
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Сериализатор модели Ingredient.'''
 
     class Meta:
@@ -98,7 +268,9 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         return None
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     '''Сериализатор для представления модели Recipe.'''
 
     tags = TagSerializer(many=True)
@@ -108,17 +280,20 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     )
     is_in_shopping_cart = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time',
+            'name', 'image', 'image_variants', 'text', 'cooking_time',
         ]
 
     def get_is_favorited(self, recipe):
         '''Метод проверки избранного.'''
+        if hasattr(recipe, 'is_favorited'):
+            return recipe.is_favorited
         user = self.context.get('request').user
         return (
             user.favorites.filter(recipe=recipe).exists() if
@@ -127,6 +302,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, recipe):
         '''Метод проверки списка покупок.'''
+        if hasattr(recipe, 'is_in_shopping_cart'):
+            return recipe.is_in_shopping_cart
         user = self.context.get('request').user
         return (
             user.shopping_user.filter(recipe=recipe).exists() if
@@ -134,7 +311,9 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
+class RecipeWriteSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     '''Сериализатор для записи модели Recipe.'''
 
     ingredients = RecipeIngredientSerializer(
@@ -156,17 +335,26 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         ingredients_data = data.get('recipe_ingredients_set')
-        if not ingredients_data:
+        if not ingredients_data and (
+            not self.partial or 'recipe_ingredients_set' in data
+        ):
             raise serializers.ValidationError(
                 'Рецепт не может быть создан без ингредиентов.'
             )
 
-        for ingredient_data in ingredients_data:
+        for ingredient_data in ingredients_data or []:
             amount = ingredient_data.get('amount')
             if amount is not None and amount <= 0:
                 raise serializers.ValidationError(
                     'Количество ингредиента должно быть больше 0.'
                 )
+        if ingredients_data:
+            validate_unique_ingredients(ingredients_data)
+
+        if not self.partial or 'tags' in data:
+            tags = data.get('tags')
+            validate_tags(tags)
+            validate_unique_tags(tags)
 
         cooking_time = data.get('cooking_time')
         if cooking_time is not None and cooking_time <= 0:
@@ -182,6 +370,15 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         representation['tags'] = instance.tags.values_list('id', flat=True)
         return representation
 
+    def save(self, **kwargs):
+        '''Метод сохранения рецепта с закрытием временного файла.'''
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def create_recipe_ingredients(self, recipe, ingredients_data):
         '''Метод оптимизации создания обьектов'''
         recipe_ingredients = [
@@ -197,10 +394,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         '''Метод создания рецепта.'''
         ingredients_data = validated_data.pop('recipe_ingredients_set')
-        validate_unique_ingredients(ingredients_data)
         tags = validated_data.pop('tags')
-        validate_tags(tags),
-        validate_unique_tags(tags)
 
         with transaction.atomic():
             recipe = Recipe.objects.create(**validated_data)
@@ -209,29 +403,85 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         return recipe
 
-    def update(self, recipe, validated_data):
-        '''Метод обновления рецепта.'''
-        recipe.name = validated_data.get('name', recipe.name)
-        recipe.text = validated_data.get('text', recipe.text)
-        recipe.cooking_time = validated_data.get(
-            'cooking_time', recipe.cooking_time
-        )
-
-        tags = validated_data.get('tags', recipe.tags.all())
-        recipe.tags.set(tags)
+    def update_tags(self, recipe, tags):
+        '''Метод обновления только изменившихся тегов рецепта.'''
+        current_ids = set(recipe.tags.values_list('id', flat=True))
+        new_ids = {tag.id for tag in tags}
+        if current_ids - new_ids:
+            recipe.tags.remove(*(current_ids - new_ids))
+        if new_ids - current_ids:
+            recipe.tags.add(*(new_ids - current_ids))
+
+    def update_recipe_ingredients(self, recipe, ingredients_data):
+        '''Метод обновления только изменившихся ингредиентов рецепта.'''
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients_set.all()
+        }
+        amounts = {
+            ingredient_data['ingredient']['id']: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+
+        to_delete = []
+        to_update = []
+        to_create = []
+        deltas = {}
+        for ingredient_id, recipe_ingredient in existing.items():
+            if ingredient_id not in amounts:
+                to_delete.append(recipe_ingredient.id)
+                deltas[ingredient_id] = -recipe_ingredient.amount
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = existing.get(ingredient_id)
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+                deltas[ingredient_id] = amount
+            elif recipe_ingredient.amount != amount:
+                deltas[ingredient_id] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+
+        if to_delete:
+            RecipeIngredient.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if deltas:
+            apply_recipe_deltas(recipe, deltas)
+            transaction.on_commit(bump_recipes_version)
 
-        ingredients_data = validated_data.get('recipe_ingredients_set', [])
+    def update(self, recipe, validated_data):
+        '''Метод обновления рецепта.
+
+        Записываются только переданные и изменившиеся поля, теги и
+        ингредиенты сравниваются с текущими и обновляются по разнице.
+        '''
+        update_fields = []
+        for field in ('name', 'text', 'cooking_time', 'image'):
+            if field in validated_data and (
+                field == 'image'
+                or getattr(recipe, field) != validated_data[field]
+            ):
+                setattr(recipe, field, validated_data[field])
+                update_fields.append(field)
 
         with transaction.atomic():
-            RecipeIngredient.objects.filter(recipe=recipe).delete()
-            self.create_recipe_ingredients(recipe, ingredients_data)
-
-            recipe.save()
+            if update_fields:
+                recipe.save(update_fields=update_fields)
+            if 'tags' in validated_data:
+                self.update_tags(recipe, validated_data['tags'])
+            if 'recipe_ingredients_set' in validated_data:
+                self.update_recipe_ingredients(
+                    recipe, validated_data['recipe_ingredients_set']
+                )
 
         return recipe
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ['user', 'recipe']
@@ -255,14 +505,27 @@ class FavoriteSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    '''Сериализатор списка id рецептов для пакетных операций.'''
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_RECIPES_LIMIT
+    )
+
+
 class ShortListRecipeSerializer(serializers.ModelSerializer):
     '''Краткий сериализатор рецепта.'''
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
-class SubscriptionSerialiazer(serializers.ModelSerializer):
+class SubscriptionSerialiazer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     '''Сериализатор модели подписок.'''
     email = serializers.EmailField(source='author.email')
     id = serializers.SerializerMethodField()
@@ -284,6 +547,8 @@ class SubscriptionSerialiazer(serializers.ModelSerializer):
         '''Метод проверки подписки юзера.'''
 
         request_user = self.context.get('request').user
+        if obj.user_id == request_user.id:
+            return True
         return (
             obj.author.follow.filter(user=request_user).exists()
             if request_user.is_authenticated else False
@@ -291,14 +556,16 @@ class SubscriptionSerialiazer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         '''Метод получения рецептов автора по подписке.'''
-        limit = self.context['request'].query_params.get('recipes_limit')
-        limit = int(limit) if limit and limit.isdigit() else LIMIT_RECIPES
-        recipes = obj.author.author_recipes.all()[:limit]
+        if hasattr(obj.author, 'limited_recipes'):
+            recipes = obj.author.limited_recipes
+        else:
+            limit = get_recipes_limit(self.context['request'])
+            recipes = obj.author.author_recipes.all()[:limit]
         return ShortListRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
         '''Метод получения количества рецептов автора.'''
-        return obj.author.author_recipes.count()
+        return obj.author.recipes_count
 
     def get_id(self, obj):
         '''Метод получения id автора.'''
@@ -330,7 +597,9 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingCartSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     '''Сериализатор для списка покупок.'''
 
     class Meta:
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from recipes.images import variants_generated
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import catalog_loaded
+from users.models import CustomUser
+from .authentication import token_user_cache
+from .cache import bump_catalog_version, bump_recipes_version
+from .ingredient_index import ingredient_index
+
+# Поля пользователя, которые выводятся в кэшированных страницах рецептов.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+# Поля пользователя, изменение которых отзывает его токены.
+TOKEN_FIELDS = ('password', 'is_active')
+
+
+def get_changed_fields(instance):
+    '''Метод получения полей, изменившихся при сохранении объекта.'''
+    return {
+        name for name, value in getattr(
+            instance, '_previous_values', {}
+        ).items()
+        if getattr(instance, name) != value
+    }
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver(catalog_loaded, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    '''Сброс индекса ингредиентов при их изменении.'''
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(catalog_loaded)
+def invalidate_catalog_cache(sender, **kwargs):
+    '''Сброс кэша справочников и рецептов при изменении справочников.'''
+    transaction.on_commit(bump_catalog_version)
+    transaction.on_commit(bump_recipes_version)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(variants_generated, sender=Recipe)
+def invalidate_recipes_cache(sender, **kwargs):
+    '''Сброс кэша страниц рецептов при изменении рецептов.'''
+    transaction.on_commit(bump_recipes_version)
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_user_fields(sender, instance, update_fields=None, **kwargs):
+    '''Запоминание прежних значений полей пользователя, влияющих на кэш.
+
+    Одним запросом читаются только сохраняемые отслеживаемые поля,
+    поэтому, например, обновление last_login при входе ничего не читает.
+    '''
+    fields = set(AUTHOR_FIELDS + TOKEN_FIELDS)
+    if update_fields is not None:
+        fields &= set(update_fields)
+    instance._previous_values = {}
+    if instance.pk is not None and fields:
+        instance._previous_values = CustomUser.objects.filter(
+            pk=instance.pk
+        ).values(*fields).first() or {}
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author_recipes_cache(sender, instance, **kwargs):
+    '''Сброс кэша страниц рецептов при изменении профиля автора.'''
+    if get_changed_fields(instance) & set(AUTHOR_FIELDS):
+        transaction.on_commit(bump_recipes_version)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    '''Сброс кэша аутентификации при удалении токена.'''
+    transaction.on_commit(lambda: token_user_cache.invalidate(instance.key))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_tokens_cache(sender, instance, **kwargs):
+    '''Сброс кэша аутентификации при смене пароля или деактивации.
+
+    Следующий запрос с токеном пользователя заново прочитает его из БД.
+    Прочие сохранения (например, last_login при входе) кэш не сбрасывают.
+    '''
+    if not get_changed_fields(instance) & set(TOKEN_FIELDS):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        transaction.on_commit(
+            lambda key=key: token_user_cache.invalidate(key)
+        )
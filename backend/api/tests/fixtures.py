@@ -0,0 +1,39 @@
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import CustomUser
+
+
+def create_user(username):
+    '''Метод создания тестового юзера.'''
+    return CustomUser.objects.create_user(
+        email=f'{username}@example.com', username=username,
+        first_name=username, last_name=username, password='Pa55word!'
+    )
+
+
+def create_ingredients(count, prefix='Ингредиент'):
+    '''Метод создания тестовых ингредиентов.'''
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'{prefix} {index:03d}', measurement_unit='г')
+        for index in range(count)
+    )
+
+
+def create_recipe(author, ingredients, amount=10, tags=()):
+    '''Метод создания тестового рецепта с ингредиентами.'''
+    recipe = Recipe.objects.create(
+        author=author, name=f'Рецепт {Recipe.objects.count() + 1}',
+        text='Описание', cooking_time=10
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+def create_tag(slug):
+    '''Метод создания тестового тега.'''
+    return Tag.objects.create(
+        name=slug, slug=slug, color='#{:06X}'.format(Tag.objects.count())
+    )
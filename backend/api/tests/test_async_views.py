@@ -0,0 +1,163 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework.test import APITestCase, force_authenticate
+
+from api.ingredient_index import ingredient_index
+from api.views import (
+    DownloadShoppingCart, IngredientViewSet, RecipeViewSet, TagViewSet,
+    UserSubscriptionListAPIView
+)
+from recipes.models import Subscription
+from .fixtures import (
+    create_ingredients, create_recipe, create_tag, create_user
+)
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncReadViewTest(APITestCase):
+    '''Тесты асинхронных представлений чтения.
+
+    Представления строятся при включенной настройке ASYNC_VIEWS, ответы
+    сравниваются с синхронными представлениями из urls.
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.tag = create_tag('breakfast')
+        ingredients = create_ingredients(3, prefix='Соль')
+        cls.recipes = [
+            create_recipe(cls.author, ingredients, tags=[cls.tag])
+            for _ in range(3)
+        ]
+        Subscription.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        cache.clear()
+        ingredient_index.invalidate()
+
+    async def call(self, view, path, user=None, method='get', **kwargs):
+        request = getattr(self.factory, method)(path)
+        if user is not None:
+            force_authenticate(request, user)
+        return await view(request, **kwargs)
+
+    def get_sync_data(self, path, user=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_as_view_is_async_only_with_setting(self):
+        self.assertTrue(asyncio.iscoroutinefunction(
+            RecipeViewSet.as_view({'get': 'list'})
+        ))
+        with override_settings(ASYNC_VIEWS=False):
+            self.assertFalse(asyncio.iscoroutinefunction(
+                RecipeViewSet.as_view({'get': 'list'})
+            ))
+
+    async def test_recipe_list_matches_sync_view(self):
+        path = '/api/recipes/?limit=2&page=2'
+        response = await self.call(
+            RecipeViewSet.as_view({'get': 'list'}), path, self.user
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            response.data, await self.async_sync_data(path, self.user)
+        )
+
+    async def test_recipe_detail(self):
+        view = RecipeViewSet.as_view({'get': 'retrieve'})
+        recipe_id = self.recipes[0].id
+        response = await self.call(
+            view, f'/api/recipes/{recipe_id}/', pk=recipe_id
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            await self.async_sync_data(f'/api/recipes/{recipe_id}/')
+        )
+        response = await self.call(view, '/api/recipes/0/', pk=0)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_catalog(self):
+        response = await self.call(
+            TagViewSet.as_view({'get': 'list'}), '/api/tags/'
+        )
+        self.assertEqual(
+            response.data, await self.async_sync_data('/api/tags/')
+        )
+        path = '/api/ingredients/?name=соль'
+        response = await self.call(
+            IngredientViewSet.as_view({'get': 'list'}), path
+        )
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data, await self.async_sync_data(path))
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=60)
+    def test_cached_catalog_hit_makes_no_queries(self):
+        view = TagViewSet.as_view({'get': 'list'})
+        call = async_to_sync(self.call)
+        response = call(view, '/api/tags/')
+        with self.assertNumQueries(0):
+            cached = call(view, '/api/tags/')
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    async def test_subscriptions(self):
+        view = UserSubscriptionListAPIView.as_view()
+        path = '/api/users/subscriptions/?recipes_limit=1'
+        response = await self.call(view, path)
+        self.assertEqual(response.status_code, 401)
+        response = await self.call(view, path, self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results'][0]['recipes']), 1)
+        self.assertEqual(
+            response.data, await self.async_sync_data(path, self.user)
+        )
+
+    async def test_download_is_streamed_asynchronously(self):
+        await self.async_post(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/'
+        )
+        view = DownloadShoppingCart.as_view({'get': 'list'})
+        response = await self.call(view, DOWNLOAD_URL, self.user)
+        self.assertTrue(response.is_async)
+        content = b''.join([
+            chunk async for chunk in response.streaming_content
+        ])
+        self.assertEqual(content, await self.async_sync_content())
+
+        request = self.factory.get(
+            DOWNLOAD_URL, headers={'If-None-Match': response['ETag']}
+        )
+        force_authenticate(request, self.user)
+        response = await view(request)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_writes_use_sync_view(self):
+        view = TagViewSet.as_view({'get': 'list', 'post': 'create'})
+        response = await self.call(view, '/api/tags/', method='post')
+        self.assertEqual(response.status_code, 401)
+
+    async def async_sync_data(self, path, user=None):
+        return await sync_to_async(self.get_sync_data)(path, user)
+
+    @sync_to_async
+    def async_post(self, path):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(path).status_code, 201)
+
+    @sync_to_async
+    def async_sync_content(self):
+        self.client.force_authenticate(self.user)
+        return b''.join(self.client.get(DOWNLOAD_URL).streaming_content)
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import token_user_cache
+from users.models import CustomUser
+from .fixtures import create_user
+
+ME_URL = '/api/auth/users/me/'
+
+
+@override_settings(TOKEN_CACHE_TIMEOUT=60)
+class TokenUserCacheTest(APITestCase):
+    '''Тесты отзыва кэшированных токенов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        token_user_cache.clear()
+        token_user_cache.set(
+            self.token.key, self.token,
+            token_user_cache.get_version(self.token.key)
+        )
+
+    def save_user(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(**kwargs)
+
+    def test_last_login_keeps_cached_token(self):
+        self.save_user(update_fields=['last_login'])
+        self.assertIsNotNone(token_user_cache.get(self.token.key))
+
+    def test_profile_change_keeps_cached_token(self):
+        self.user.first_name = 'Иван'
+        self.save_user()
+        self.assertIsNotNone(token_user_cache.get(self.token.key))
+
+    def test_password_change_revokes_token(self):
+        self.user.set_password('N3w-pa55word')
+        self.save_user()
+        self.assertIsNone(token_user_cache.get(self.token.key))
+
+    def test_deactivation_revokes_token(self):
+        self.user.is_active = False
+        self.save_user(update_fields=['is_active'])
+        self.assertIsNone(token_user_cache.get(self.token.key))
+
+
+@override_settings(TOKEN_CACHE_TIMEOUT=60)
+class StaleCachedUserSaveTest(APITestCase):
+    '''Тесты сохранения устаревшего юзера из кэша токенов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('cook')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        token_user_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            recipes_count=3, followers_count=2
+        )
+
+    def assertCountersKept(self):
+        self.assertEqual(
+            CustomUser.objects.values_list(
+                'recipes_count', 'followers_count'
+            ).get(pk=self.user.pk),
+            (3, 2)
+        )
+
+    def test_djoser_set_password_keeps_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/auth/users/set_password/',
+                {'current_password': 'Pa55word!',
+                 'new_password': 'N3w-pa55word'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertCountersKept()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('N3w-pa55word'))
+
+    def test_djoser_profile_update_keeps_counters(self):
+        response = self.client.patch(
+            '/api/auth/users/me/', {'first_name': 'Иван'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersKept()
+        self.assertEqual(
+            CustomUser.objects.get(pk=self.user.pk).first_name, 'Иван'
+        )
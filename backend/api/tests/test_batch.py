@@ -0,0 +1,97 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from .fixtures import create_ingredients, create_recipe, create_user
+
+CART_URL = '/api/recipes/shopping_cart/'
+FAVORITE_URL = '/api/recipes/favorite/'
+
+
+class BatchRecipeListTest(APITestCase):
+    '''Тесты пакетного добавления и удаления рецептов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        author = create_user('author')
+        ingredients = create_ingredients(3)
+        cls.recipes = [
+            create_recipe(author, ingredients[index:index + 2])
+            for index in range(2)
+        ]
+        cls.own_recipe = create_recipe(cls.user, ingredients[:1])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {
+            result['id']: result['status']
+            for result in response.data['results']
+        }
+
+    def get_counts(self, field):
+        return dict(Recipe.objects.values_list('id', field))
+
+    def test_add(self):
+        first, second = (recipe.id for recipe in self.recipes)
+        ShoppingCart.objects.create(user=self.user, recipe_id=first)
+        response = self.client.post(
+            CART_URL, {'recipes': [first, second, 999]}, format='json'
+        )
+        self.assertEqual(self.get_statuses(response), {
+            first: 'already_exists', second: 'added', 999: 'not_found'
+        })
+        counts = self.get_counts('in_carts_count')
+        self.assertEqual((counts[first], counts[second]), (1, 1))
+        self.assertEqual(
+            sorted(ShoppingListItem.objects.values_list(
+                'total_amount', flat=True
+            )),
+            [10, 10, 20]
+        )
+
+    def test_add_own_recipe_to_favorites(self):
+        response = self.client.post(
+            FAVORITE_URL, {'recipes': [self.own_recipe.id]}, format='json'
+        )
+        self.assertEqual(
+            self.get_statuses(response), {self.own_recipe.id: 'own_recipe'}
+        )
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_remove_uses_single_delete(self):
+        first, second = (recipe.id for recipe in self.recipes)
+        self.client.post(CART_URL, {'recipes': [first, second]}, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                CART_URL, {'recipes': [first, second, 999]}, format='json'
+            )
+        self.assertEqual(self.get_statuses(response), {
+            first: 'removed', second: 'removed', 999: 'not_found'
+        })
+        self.assertEqual(
+            sum(query['sql'].startswith('DELETE FROM "recipes_shoppingcart"')
+                for query in queries),
+            1
+        )
+        self.assertEqual(
+            set(self.get_counts('in_carts_count').values()), {0}
+        )
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_clear(self):
+        self.client.post(
+            CART_URL, {'recipes': [recipe.id for recipe in self.recipes]},
+            format='json'
+        )
+        response = self.client.delete(CART_URL + 'clear/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(ShoppingListItem.objects.exists())
+        self.assertEqual(
+            set(self.get_counts('in_carts_count').values()), {0}
+        )
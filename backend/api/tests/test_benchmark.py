@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from recipes.models import Favorite, Recipe, Subscription, Tag
+from users.models import CustomUser
+from .fixtures import create_ingredients, create_tag
+
+ENDPOINTS = {
+    'recipe_list', 'recipe_list_filtered', 'recipe_list_cursor',
+    'recipe_detail', 'subscriptions', 'download_shopping_cart',
+    'ingredient_search',
+}
+
+
+class BenchmarkCommandsTest(TestCase):
+    '''Тесты генератора данных и бенчмарка эндпоинтов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(20)
+        create_tag('breakfast')
+        create_tag('dinner')
+
+    def seed(self, **options):
+        call_command(
+            'seed_benchmark_data', users=10, recipes=30, stdout=StringIO(),
+            **options
+        )
+
+    def benchmark(self, *args, **options):
+        stdout = StringIO()
+        call_command(
+            'run_benchmark', *args, iterations=2, warmup=0, stdout=stdout,
+            **options
+        )
+        return stdout.getvalue()
+
+    def test_seed_data(self):
+        self.seed()
+        self.assertEqual(CustomUser.objects.count(), 10)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertTrue(Favorite.objects.exists())
+        self.assertTrue(Subscription.objects.exists())
+        self.assertFalse(
+            Subscription.objects.filter(user_id=F('author_id')).exists()
+        )
+        self.assertFalse(
+            Favorite.objects.filter(recipe__author_id=F('user_id')).exists()
+        )
+        for user in CustomUser.objects.annotate(
+            recipes=Count('author_recipes')
+        ):
+            self.assertEqual(user.recipes_count, user.recipes)
+
+    def test_seed_prefix_is_unique(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed(prefix='other')
+        self.assertEqual(CustomUser.objects.count(), 20)
+
+    def test_seed_requires_catalog(self):
+        Tag.objects.all().delete()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_benchmark_report(self):
+        self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.benchmark(output=path)
+            with open(path, encoding='utf-8') as file:
+                results = json.load(file)
+            self.assertEqual(set(results), ENDPOINTS)
+            for name, result in results.items():
+                self.assertEqual(result['status'], 200, name)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertGreater(result['queries'], 0, name)
+            output = self.benchmark(compare=path)
+        self.assertIn('recipe_list: p50', output)
+
+    def test_benchmark_asgi(self):
+        self.seed()
+        output = self.benchmark('--asgi')
+        results = json.loads(output[:output.rindex('}') + 1])
+        self.assertEqual(
+            {result['status'] for result in results.values()}, {200}
+        )
+
+    def test_benchmark_without_data(self):
+        with self.assertRaises(CommandError):
+            self.benchmark()
@@ -0,0 +1,279 @@
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.cache import (
+    CATALOG_VERSION_KEY, RECIPES_VERSION_KEY, bump_catalog_version,
+    get_version
+)
+from api.checks import check_shared_cache
+from api.ingredient_index import ingredient_index
+from recipes.constants import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient, Tag
+from .fixtures import (
+    create_ingredients, create_recipe, create_tag, create_user
+)
+
+LOCMEM = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}}
+FILE_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': tempfile.gettempdir(),
+}}
+
+
+class SharedCacheCheckTest(TestCase):
+    '''Тесты проверки общего кэша для поколений.'''
+
+    @override_settings(
+        CACHES=LOCMEM, CATALOG_CACHE_TIMEOUT=60, RECIPE_PAGE_CACHE_TIMEOUT=0,
+        TOKEN_CACHE_TIMEOUT=0
+    )
+    def test_locmem_with_versioned_cache_is_error(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ['api.E001'])
+
+    @override_settings(
+        CACHES=LOCMEM, CATALOG_CACHE_TIMEOUT=0, RECIPE_PAGE_CACHE_TIMEOUT=0,
+        TOKEN_CACHE_TIMEOUT=0
+    )
+    def test_locmem_without_versioned_cache_is_allowed(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(
+        CACHES=FILE_CACHE, CATALOG_CACHE_TIMEOUT=60,
+        RECIPE_PAGE_CACHE_TIMEOUT=60
+    )
+    def test_shared_backend_is_allowed(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class CatalogVersionTest(TestCase):
+    '''Тесты сброса поколения справочников.'''
+
+    def test_loader_bumps_catalog_version(self):
+        version = get_version(CATALOG_VERSION_KEY)
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8'
+        ) as file:
+            file.write('Соль,г\nПерец,г\n')
+            file.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(
+                    'load_ingredients', path=file.name, stdout=StringIO()
+                )
+        self.assertNotEqual(get_version(CATALOG_VERSION_KEY), version)
+
+    @override_settings(INGREDIENT_INDEX_TTL=3600)
+    def test_index_follows_catalog_version(self):
+        '''Индекс перестраивается после сброса поколения в другом процессе.'''
+        ingredient_index.invalidate()
+        self.assertEqual(ingredient_index.search('соль'), [])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль', measurement_unit='г')
+        ])
+        self.assertEqual(ingredient_index.search('соль'), [])
+        bump_catalog_version()
+        self.assertEqual(
+            [item['name'] for item in ingredient_index.search('соль')],
+            ['Соль']
+        )
+
+
+class CatalogLoaderTest(TestCase):
+    '''Тесты пакетной загрузки справочников.'''
+
+    def load(self, command, content, **options):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8'
+        ) as file:
+            file.write(content)
+            file.flush()
+            stdout = StringIO()
+            call_command(command, path=file.name, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_ingredients_are_loaded_once(self):
+        content = 'Соль,г\nПерец,г\nСоль,г\n'
+        output = self.load('load_ingredients', content)
+        self.assertIn('добавлено 2, пропущено 1', output)
+        output = self.load('load_ingredients', content)
+        self.assertIn('добавлено 0, пропущено 3', output)
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_tags_are_loaded_once(self):
+        content = 'Завтрак,#E26C2D,breakfast\nОбед,#49B64E,lunch\n'
+        self.assertIn(
+            'добавлено 2, пропущено 0', self.load('load_tags', content)
+        )
+        self.assertIn(
+            'добавлено 0, пропущено 2', self.load('load_tags', content)
+        )
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_queries_per_batch(self):
+        '''Строки вставляются пачками, а не по одной.'''
+        content = ''.join(f'Ингредиент {index},г\n' for index in range(6))
+        with self.assertNumQueries(5):
+            self.load('load_ingredients', content, batch_size=6)
+        Ingredient.objects.all().delete()
+        with self.assertNumQueries(7):
+            self.load('load_ingredients', content, batch_size=2)
+        self.assertEqual(Ingredient.objects.count(), 6)
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.load('load_ingredients', 'Соль,г\n', batch_size=0)
+        with self.assertRaises(CommandError):
+            call_command(
+                'load_ingredients', path='missing.csv', stdout=StringIO()
+            )
+
+
+@override_settings(CATALOG_CACHE_TIMEOUT=60)
+class CatalogCacheTest(APITestCase):
+    '''Тесты кэша ответов справочников.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = create_tag('breakfast')
+        cls.ingredient = create_ingredients(1)[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_hit_makes_no_queries(self):
+        for path in (
+            '/api/tags/', f'/api/tags/{self.tag.id}/',
+            f'/api/ingredients/{self.ingredient.id}/',
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                with self.assertNumQueries(0):
+                    cached = self.client.get(path)
+                self.assertEqual(cached.data, response.data)
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/tags/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_tag_change_bumps_version(self):
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tag('dinner')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+
+@override_settings(CATALOG_CACHE_TIMEOUT=0, INGREDIENT_INDEX_TTL=3600)
+class IngredientSearchTest(APITestCase):
+    '''Тесты поиска ингредиентов по индексу.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('соль', 'Сода', 'Соевый соус', 'Сахар')
+        )
+
+    def setUp(self):
+        ingredient_index.invalidate()
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_warm_search_makes_no_queries(self):
+        self.search('с')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('сах'), ['Сахар'])
+
+    def test_case_insensitive_sorted_prefix(self):
+        self.assertEqual(self.search('СО'), ['Сода', 'Соевый соус', 'соль'])
+        self.assertEqual(self.search('перец'), [])
+
+    def test_limit(self):
+        create_ingredients(INGREDIENT_SEARCH_LIMIT + 5, prefix='Перец')
+        names = self.search('перец')
+        self.assertEqual(len(names), INGREDIENT_SEARCH_LIMIT)
+        self.assertEqual(names, sorted(names))
+
+    def test_index_is_reset_on_change(self):
+        self.assertEqual(self.search('пер'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Перец', measurement_unit='г')
+        self.assertEqual(self.search('пер'), ['Перец'])
+
+
+@override_settings(RECIPE_PAGE_CACHE_TIMEOUT=300)
+class RecipePageCacheTest(APITestCase):
+    '''Тесты сброса кэша страниц рецептов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        create_recipe(cls.author, create_ingredients(1))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_author_name(self):
+        response = self.client.get('/api/recipes/')
+        return response.data['results'][0]['author']['first_name']
+
+    def test_anonymous_hit_makes_no_queries(self):
+        create_tag('breakfast')
+        create_tag('dinner')
+        response = self.client.get(
+            '/api/recipes/?tags=dinner&tags=breakfast&limit=6'
+        )
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                '/api/recipes/?limit=6&tags=breakfast&tags=dinner'
+            )
+        self.assertEqual(cached.data, response.data)
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.client.force_authenticate(self.author)
+        self.client.get('/api/recipes/')
+        with self.assertNumQueries(5):
+            self.client.get('/api/recipes/')
+
+    def test_other_params_are_not_cached(self):
+        self.client.get('/api/recipes/?search=рецепт')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/?search=рецепт')
+        self.assertTrue(queries)
+
+    def test_recipe_change_bumps_version(self):
+        self.get_author_name()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.author, [])
+        self.assertEqual(self.client.get('/api/recipes/').data['count'], 2)
+
+    def test_author_profile_change_bumps_version(self):
+        self.assertEqual(self.get_author_name(), 'author')
+        self.author.first_name = 'Иван'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.get_author_name(), 'Иван')
+
+    def test_last_login_does_not_bump_version(self):
+        version = get_version(RECIPES_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save(update_fields=['last_login'])
+        self.assertEqual(get_version(RECIPES_VERSION_KEY), version)
@@ -0,0 +1,63 @@
+from rest_framework.test import APITestCase
+
+from recipes.counters import change_counter, delete_counted
+from recipes.models import (
+    Favorite, Recipe, ShoppingCart, ShoppingListItem, Subscription
+)
+from users.models import CustomUser
+from .fixtures import create_ingredients, create_recipe, create_user
+
+
+class CounterTest(APITestCase):
+    '''Тесты денормализованных счетчиков.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author, create_ingredients(2))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_recipe(self):
+        return Recipe.objects.get(pk=self.recipe.pk)
+
+    def test_counter_does_not_go_below_zero(self):
+        change_counter(Favorite, [self.recipe.pk], -1)
+        self.assertEqual(self.get_recipe().favorites_count, 0)
+
+    def test_unfavorite_with_zero_counter(self):
+        '''Удаление при рассинхронизированном счетчике не дает 500.'''
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=0)
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.get_recipe().favorites_count, 0)
+
+    def test_repeated_delete_decrements_once(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        other = create_user('other')
+        Favorite.objects.create(user=other, recipe=self.recipe)
+        self.assertEqual(self.get_recipe().favorites_count, 2)
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertEqual(self.get_recipe().favorites_count, 1)
+
+    def test_delete_counted_returns_deleted_rows(self):
+        Subscription.objects.create(user=self.user, author=self.author)
+        queryset = Subscription.objects.filter(user=self.user)
+        self.assertEqual(delete_counted(queryset), [self.author.pk])
+        self.assertEqual(delete_counted(queryset), [])
+        self.assertEqual(
+            CustomUser.objects.get(pk=self.author.pk).followers_count, 0
+        )
+
+    def test_remove_from_cart_updates_shopping_list(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(ShoppingListItem.objects.count(), 2)
+        url = f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(ShoppingListItem.objects.exists())
+        self.assertEqual(self.get_recipe().in_carts_count, 0)
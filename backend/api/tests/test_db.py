@@ -0,0 +1,156 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.connection import ConnectionDoesNotExist
+
+from api.ingredient_index import ingredient_index
+from foodgram.db.middleware import PrimaryPinningMiddleware
+from foodgram.db.router import ReplicaRouter, primary_reads, read_alias
+from recipes.models import Recipe
+
+PRIMARY_COOKIE = PrimaryPinningMiddleware.cookie_name
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    '''Тесты роутера чтения с реплик.'''
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_from_selected_replica(self):
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+        token = read_alias.set('replica1')
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica1')
+            self.assertEqual(
+                self.router.db_for_write(Recipe), DEFAULT_DB_ALIAS
+            )
+        finally:
+            read_alias.reset(token)
+
+    def test_primary_reads_context(self):
+        token = read_alias.set('replica1')
+        try:
+            with primary_reads():
+                self.assertEqual(
+                    self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS
+                )
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica1')
+        finally:
+            read_alias.reset(token)
+
+    def test_migrations_only_on_primary(self):
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'api'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'api'))
+
+
+class ReplicaRouterTransactionTest(TestCase):
+    '''Тесты чтения с основной БД внутри транзакции.'''
+
+    def test_reads_from_primary_in_atomic_block(self):
+        token = read_alias.set('replica1')
+        try:
+            self.assertEqual(
+                ReplicaRouter().db_for_read(Recipe), DEFAULT_DB_ALIAS
+            )
+        finally:
+            read_alias.reset(token)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=10)
+class PrimaryPinningMiddlewareTest(SimpleTestCase):
+    '''Тесты выбора БД для чтения в запросе.'''
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.aliases = []
+
+    def get_response(self, status=200):
+        def get_response(request):
+            self.aliases.append(read_alias.get())
+            return HttpResponse(status=status)
+        return get_response
+
+    def test_disabled_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                PrimaryPinningMiddleware(self.get_response())
+
+    def test_safe_request_reads_from_replica(self):
+        middleware = PrimaryPinningMiddleware(self.get_response())
+        response = middleware(self.factory.get('/api/recipes/'))
+        self.assertEqual(self.aliases, ['replica1'])
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+        self.assertIsNone(read_alias.get())
+
+    def test_write_pins_client_to_primary(self):
+        middleware = PrimaryPinningMiddleware(self.get_response())
+        response = middleware(self.factory.post('/api/recipes/'))
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        request = self.factory.get('/api/recipes/')
+        request.COOKIES[PRIMARY_COOKIE] = cookie.value
+        middleware(request)
+        self.assertEqual(self.aliases, [None, None])
+
+    def test_failed_write_does_not_pin(self):
+        middleware = PrimaryPinningMiddleware(self.get_response(400))
+        response = middleware(self.factory.post('/api/recipes/'))
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_async_request_reads_from_replica(self):
+        get_response = self.get_response()
+
+        async def aget_response(request):
+            return get_response(request)
+
+        middleware = PrimaryPinningMiddleware(aget_response)
+        async_to_sync(middleware)(self.factory.get('/api/recipes/'))
+        self.assertEqual(self.aliases, ['replica1'])
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica1'],
+    CATALOG_CACHE_TIMEOUT=60, RECIPE_PAGE_CACHE_TIMEOUT=60
+)
+class ReplicaCacheFillTest(SimpleTestCase):
+    '''Тесты заполнения общего кэша по основной БД.
+
+    Запросы идут без транзакции, поэтому роутер направляет чтения на
+    реплику replica1, которой в тестах нет: чтение с нее упало бы.
+    '''
+
+    databases = {DEFAULT_DB_ALIAS}
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+
+    def assertFilledFromPrimary(self, url):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(queries)
+
+    def test_catalog_cache_is_filled_from_primary(self):
+        self.assertFilledFromPrimary('/api/tags/')
+
+    def test_ingredient_index_is_built_from_primary(self):
+        self.assertFilledFromPrimary('/api/ingredients/?name=соль')
+
+    def test_recipe_page_cache_is_filled_from_primary(self):
+        self.assertFilledFromPrimary('/api/recipes/')
+
+    def test_uncached_reads_go_to_replica(self):
+        with override_settings(CATALOG_CACHE_TIMEOUT=0):
+            with self.assertRaises(ConnectionDoesNotExist):
+                self.client.get('/api/tags/')
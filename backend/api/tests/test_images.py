@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from api.cache import RECIPES_VERSION_KEY, get_version
+from recipes import images
+from recipes.images import generate_variants
+from .fixtures import create_ingredients, create_recipe, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+    '''Тесты уменьшенных копий фото рецепта.'''
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_executor_is_created_on_first_use(self):
+        with mock.patch.object(images, 'executor', None):
+            executor = images.get_executor()
+            self.assertIs(images.get_executor(), executor)
+        executor.shutdown()
+
+    def test_generate_variants_bumps_recipes_version(self):
+        '''Запись вариантов через update() сбрасывает кэш страниц.'''
+        recipe = create_recipe(create_user('author'), create_ingredients(1))
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(buffer, 'PNG')
+        recipe.image.save('photo.png', ContentFile(buffer.getvalue()))
+        version = get_version(RECIPES_VERSION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_variants(recipe.id)
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        self.assertEqual(
+            set(recipe.image_variants['thumbnail']), {'webp', 'jpeg'}
+        )
+        self.assertNotEqual(get_version(RECIPES_VERSION_KEY), version)
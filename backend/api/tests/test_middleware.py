@@ -0,0 +1,55 @@
+import json
+
+from django.test import override_settings
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from recipes.models import ShoppingCart
+from .fixtures import create_ingredients, create_recipe, create_user
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingMiddlewareTest(APITestCase):
+    '''Тесты метрик запросов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        cls.recipe = create_recipe(
+            create_user('author'), create_ingredients(2)
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_log(self, logs):
+        self.assertEqual(len(logs.records), 1)
+        return json.loads(logs.records[0].getMessage())
+
+    def test_server_timing_header(self):
+        with self.assertLogs('foodgram.timing') as logs:
+            response = self.client.get('/api/recipes/')
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        log = self.get_log(logs)
+        self.assertGreater(log['queries'], 0)
+        self.assertEqual(log['db_connects'], 0)
+
+    def test_streaming_queries_are_counted(self):
+        '''Запросы при отдаче потокового ответа попадают в лог.'''
+        with self.assertLogs('foodgram.timing') as logs:
+            response = self.client.get('/api/recipes/download_shopping_cart/')
+            self.assertNotIn('Server-Timing', response)
+            b''.join(response.streaming_content)
+        self.assertGreater(self.get_log(logs)['queries'], 0)
+
+    def test_serializers_are_not_patched(self):
+        with self.assertLogs('foodgram.timing'):
+            self.client.get('/api/tags/')
+        for serializer_class in (
+            serializers.Serializer, serializers.ListSerializer
+        ):
+            self.assertEqual(
+                serializer_class.to_representation.__module__,
+                'rest_framework.serializers'
+            )
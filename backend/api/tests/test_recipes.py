@@ -0,0 +1,358 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscription
+from users.models import CustomUser
+from .fixtures import (
+    create_ingredients, create_recipe, create_tag, create_user
+)
+
+
+class RecipeWriteTest(APITestCase):
+    '''Тесты проверки данных при записи рецепта.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(2)
+        cls.tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.recipe = create_recipe(
+            cls.author, cls.ingredients[:1], tags=cls.tags[:1]
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def get_data(self, **kwargs):
+        data = {
+            'name': 'Каша', 'text': 'Сварить', 'cooking_time': 5,
+            'tags': [self.tags[0].id],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 5}],
+        }
+        data.update(kwargs)
+        return data
+
+    def test_create_with_duplicate_ingredients(self):
+        ingredient_id = self.ingredients[0].id
+        response = self.client.post('/api/recipes/', self.get_data(
+            ingredients=[{'id': ingredient_id, 'amount': 5}] * 2
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_create_without_tags(self):
+        response = self.client.post(
+            '/api/recipes/', self.get_data(tags=[]), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_with_duplicate_tags(self):
+        '''Ошибка возвращается при проверке, до записи полей рецепта.'''
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {'name': 'Новое название', 'tags': [self.tags[1].id] * 2},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.name, 'Новое название')
+
+    def test_partial_update_without_tags(self):
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/', {'cooking_time': 7},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['tags']), [self.tags[0].id])
+
+
+class RecipeSearchTest(APITestCase):
+    '''Тесты поиска рецептов без PostgreSQL.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.by_name = create_recipe(author, [])
+        cls.by_text = create_recipe(author, [])
+        create_recipe(author, [])
+        Recipe.objects.filter(pk=cls.by_name.pk).update(name='Зеленый борщ')
+        Recipe.objects.filter(pk=cls.by_text.pk).update(
+            text='Как борщ, но без свеклы'
+        )
+
+    def search(self, value):
+        response = self.client.get('/api/recipes/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_matches_go_first(self):
+        self.assertEqual(
+            self.search('борщ'), [self.by_name.id, self.by_text.id]
+        )
+
+    def test_no_matches(self):
+        self.assertEqual(self.search('солянка'), [])
+
+    def test_blank_search_is_ignored(self):
+        self.assertEqual(len(self.search('  ')), 3)
+
+
+class RecipeUserFlagsTest(APITestCase):
+    '''Тесты флагов избранного и списка покупок в выдаче рецептов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        author = create_user('author')
+        ingredients = create_ingredients(2)
+        cls.recipes = [create_recipe(author, ingredients) for _ in range(4)]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_flags(self, path='/api/recipes/'):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return {
+            recipe['id']: (
+                recipe['is_favorited'], recipe['is_in_shopping_cart']
+            )
+            for recipe in response.data['results']
+        }
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return len(queries)
+
+    def test_list_flags(self):
+        self.assertEqual(self.get_flags(), {
+            self.recipes[0].id: (True, False),
+            self.recipes[1].id: (False, True),
+            self.recipes[2].id: (False, False),
+            self.recipes[3].id: (False, False),
+        })
+
+    def test_detail_flags(self):
+        response = self.client.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertFalse(response.data['is_in_shopping_cart'])
+
+    def test_anonymous_flags(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            set(self.get_flags().values()), {(False, False)}
+        )
+
+    def test_flags_do_not_add_queries_per_recipe(self):
+        '''Флаги аннотируются в запросе рецептов, а не считаются по одному.'''
+        self.assertEqual(
+            self.count_queries('/api/recipes/?limit=1'),
+            self.count_queries('/api/recipes/?limit=4')
+        )
+
+
+class RecipeReadQueriesTest(APITestCase):
+    '''Тесты числа запросов при чтении рецептов.
+
+    Автор, теги и ингредиенты подгружаются отдельными запросами на всю
+    страницу, поэтому их число не зависит от размера страницы и состава
+    рецептов.
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        author = create_user('author')
+        ingredients = create_ingredients(5)
+        tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.recipes = [
+            create_recipe(author, ingredients[:index + 1], tags=tags)
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries(self):
+        for limit in (1, 5):
+            with self.subTest(limit=limit), self.assertNumQueries(5):
+                response = self.client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_returns_nested_relations(self):
+        response = self.client.get('/api/recipes/')
+        results = {item['id']: item for item in response.data['results']}
+        for index, recipe in enumerate(self.recipes):
+            data = results[recipe.id]
+            self.assertEqual(len(data['ingredients']), index + 1)
+            self.assertEqual(len(data['tags']), 2)
+            self.assertEqual(data['author']['username'], 'author')
+
+    def test_detail_queries(self):
+        for recipe in (self.recipes[0], self.recipes[-1]):
+            with self.subTest(recipe=recipe.id), self.assertNumQueries(4):
+                response = self.client.get(f'/api/recipes/{recipe.id}/')
+            self.assertEqual(response.status_code, 200)
+
+
+class SubscriptionListQueriesTest(APITestCase):
+    '''Тесты выдачи подписок.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredients = create_ingredients(1)
+        cls.authors = [create_user(f'author{index}') for index in range(3)]
+        for index, author in enumerate(cls.authors):
+            for _ in range(index + 2):
+                create_recipe(author, ingredients)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def subscribe(self, authors):
+        Subscription.objects.bulk_create(
+            Subscription(user=self.user, author=author) for author in authors
+        )
+
+    def get_subscriptions(self, query=''):
+        response = self.client.get(f'/api/users/subscriptions/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_queries_do_not_depend_on_authors(self):
+        '''Рецепты всех авторов выбираются одним запросом.'''
+        self.subscribe(self.authors[:1])
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.get_subscriptions()), 1)
+        self.subscribe(self.authors[1:])
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.get_subscriptions()), 3)
+
+    def test_recipes_limit(self):
+        self.subscribe(self.authors)
+        subscriptions = self.get_subscriptions('?recipes_limit=2')
+        self.assertEqual(
+            [len(item['recipes']) for item in subscriptions], [2, 2, 2]
+        )
+        subscriptions = self.get_subscriptions('?recipes_limit=3')
+        self.assertEqual(
+            [len(item['recipes']) for item in subscriptions], [2, 3, 3]
+        )
+
+    def test_latest_recipes_go_first(self):
+        self.subscribe(self.authors[-1:])
+        recipes = self.get_subscriptions('?recipes_limit=2')[0]['recipes']
+        expected = self.authors[-1].author_recipes.order_by('-created')
+        self.assertEqual(
+            [recipe['id'] for recipe in recipes],
+            list(expected.values_list('id', flat=True)[:2])
+        )
+
+    def test_recipes_count_comes_from_counter(self):
+        self.subscribe(self.authors[:1])
+        self.assertEqual(self.get_subscriptions()[0]['recipes_count'], 2)
+        CustomUser.objects.filter(pk=self.authors[0].pk).update(
+            recipes_count=10
+        )
+        self.assertEqual(self.get_subscriptions()[0]['recipes_count'], 10)
+
+
+@override_settings(RECIPE_PAGE_CACHE_TIMEOUT=0)
+class RecipeCursorPaginationTest(APITestCase):
+    '''Тесты курсорного режима выдачи рецептов.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        ingredients = create_ingredients(1)
+        cls.recipes = [create_recipe(author, ingredients) for _ in range(5)]
+
+    def test_first_page_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/?cursor=&limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertFalse([
+            query for query in queries if 'COUNT(' in query['sql']
+        ])
+        self.assertEqual(len(queries), 4)
+
+    def test_walks_all_recipes_once(self):
+        ids = []
+        url = '/api/recipes/?cursor=&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, list(
+            Recipe.objects.order_by('-created', '-id').values_list(
+                'id', flat=True
+            )
+        ))
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/recipes/?page=2&limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class RecipeFilterTest(APITestCase):
+    '''Тесты фильтрации рецептов по тегам и флагам юзера.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        author = create_user('author')
+        ingredients = create_ingredients(1)
+        cls.tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.both = create_recipe(author, ingredients, tags=cls.tags)
+        cls.breakfast = create_recipe(author, ingredients, tags=cls.tags[:1])
+        cls.untagged = create_recipe(author, ingredients)
+        for recipe in (cls.both, cls.breakfast, cls.untagged):
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.both)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        self.queries = [
+            query['sql'] for query in queries
+            if 'FROM "recipes_recipe" WHERE' in query['sql']
+        ]
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(response.data['count'], len(ids))
+        return set(ids)
+
+    def test_tags_with_favorites_without_duplicates(self):
+        ids = self.get_ids('tags=breakfast&tags=dinner&is_favorited=1')
+        self.assertEqual(ids, {self.both.id, self.breakfast.id})
+        self.assertEqual(len(self.queries), 2)
+        for sql in self.queries:
+            self.assertNotIn('DISTINCT', sql)
+            self.assertNotIn(' JOIN ', sql)
+
+    def test_tag_and_shopping_cart(self):
+        self.assertEqual(
+            self.get_ids('tags=dinner&is_in_shopping_cart=1'), {self.both.id}
+        )
+        self.assertEqual(
+            self.get_ids('is_favorited=0'),
+            {self.both.id, self.breakfast.id, self.untagged.id}
+        )
+
+    def test_anonymous_flags_filter(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_ids('is_favorited=1'), set())
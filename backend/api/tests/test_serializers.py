@@ -0,0 +1,170 @@
+import base64
+import os
+import textwrap
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from api.serializers import Base64ImageField
+from recipes.constants import BASE64_CHUNK_SIZE
+from recipes.models import Subscription
+from .fixtures import (
+    create_ingredients, create_recipe, create_tag, create_user
+)
+
+
+def get_image_data(size=(300, 300)):
+    '''Функция получения PNG с шумом, не сжимаемого до одной части.'''
+    buffer = BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, 'PNG'
+    )
+    return buffer.getvalue()
+
+
+@override_settings(
+    RECIPE_IMAGE_MAX_SIZE=10 * 1024 * 1024, RECIPE_IMAGE_MAX_PIXELS=10 ** 6
+)
+class Base64ImageFieldTest(SimpleTestCase):
+    '''Тесты декодирования картинок из base64.'''
+
+    def decode(self, encoded):
+        return Base64ImageField().decode_base64(
+            'data:image/png;base64,' + encoded
+        )
+
+    def test_wrapped_base64_spanning_chunks(self):
+        '''Переносы строк не сдвигают границы частей декодирования.'''
+        data = get_image_data()
+        encoded = '\n'.join(textwrap.wrap(base64.b64encode(data).decode(), 76))
+        self.assertGreater(len(encoded), 2 * BASE64_CHUNK_SIZE)
+        file = self.decode(encoded)
+        self.assertEqual(file.read(), data)
+        file.close()
+
+    def test_invalid_base64(self):
+        with self.assertRaises(ValidationError):
+            self.decode('abc')
+
+    def test_pixel_limit(self):
+        field = Base64ImageField()
+        file = self.decode(base64.b64encode(get_image_data()).decode())
+        with override_settings(RECIPE_IMAGE_MAX_PIXELS=100):
+            with self.assertRaises(ValidationError):
+                field.validate_limits(file)
+        file.close()
+
+    def test_size_limit_checked_before_decoding(self):
+        encoded = base64.b64encode(get_image_data()).decode()
+        with override_settings(RECIPE_IMAGE_MAX_SIZE=1024):
+            with mock.patch('api.serializers.base64.b64decode') as decode:
+                with self.assertRaises(ValidationError) as error:
+                    self.decode(encoded)
+        self.assertEqual(error.exception.detail[0].code, 'max_size')
+        decode.assert_not_called()
+
+    def test_decoded_size_limit(self):
+        '''Точный размер проверяется при декодировании.'''
+        data = get_image_data()
+        encoded = base64.b64encode(data).decode()
+        with override_settings(RECIPE_IMAGE_MAX_SIZE=len(data) - 1000):
+            with mock.patch(
+                'api.serializers.base64.b64decode', wraps=base64.b64decode
+            ) as decode:
+                with self.assertRaises(ValidationError) as error:
+                    self.decode(encoded)
+        self.assertEqual(error.exception.detail[0].code, 'max_size')
+        decode.assert_called()
+
+    def test_wrapped_base64_at_size_limit(self):
+        data = get_image_data()
+        encoded = '\r\n'.join(
+            textwrap.wrap(base64.b64encode(data).decode(), 76)
+        )
+        with override_settings(RECIPE_IMAGE_MAX_SIZE=len(data)):
+            file = self.decode(encoded)
+        self.assertEqual(file.read(), data)
+        file.close()
+
+
+class SparseFieldsetTest(APITestCase):
+    '''Тесты выборочных полей ответа ?fields= и ?omit=.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{index}') for index in range(3)]
+        ingredients = create_ingredients(2)
+        tag = create_tag('breakfast')
+        cls.recipes = [
+            create_recipe(author, ingredients, tags=[tag])
+            for author in cls.authors
+        ]
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, author=author)
+            for author in cls.authors
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_recipe_fields(self):
+        data = self.get('/api/recipes/?fields=id,name', 2)
+        self.assertEqual(
+            [set(recipe) for recipe in data['results']],
+            [{'id', 'name'}] * 3
+        )
+
+    def test_recipe_omit(self):
+        data = self.get('/api/recipes/?omit=text,ingredients', 4)
+        recipe = data['results'][0]
+        self.assertNotIn('text', recipe)
+        self.assertNotIn('ingredients', recipe)
+        self.assertIn('is_favorited', recipe)
+        self.assertEqual(recipe['author']['is_subscribed'], True)
+
+    def test_recipe_detail_fields(self):
+        recipe_id = self.recipes[0].id
+        data = self.get(
+            f'/api/recipes/{recipe_id}/?fields=id,tags,is_favorited', 2
+        )
+        self.assertEqual(set(data), {'id', 'tags', 'is_favorited'})
+        self.assertEqual(data['tags'][0]['slug'], 'breakfast')
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/recipes/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_fields(self):
+        data = self.get('/api/users/?fields=id,username', 2)
+        self.assertEqual(
+            {frozenset(user) for user in data['results']},
+            {frozenset({'id', 'username'})}
+        )
+
+    def test_subscription_omit_recipes(self):
+        data = self.get('/api/users/subscriptions/?omit=recipes', 2)
+        self.assertEqual(len(data['results']), 3)
+        for subscription in data['results']:
+            self.assertNotIn('recipes', subscription)
+            self.assertEqual(subscription['recipes_count'], 1)
+
+    def test_write_ignores_fields(self):
+        self.client.force_authenticate(self.authors[0])
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[0].id}/?fields=id',
+            {'cooking_time': 7}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ingredients', response.data)
+        self.assertEqual(response.data['cooking_time'], 7)
@@ -0,0 +1,206 @@
+import json
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from api.exports import PDFWriter
+from recipes.models import ShoppingCart, ShoppingListItem, ShoppingListVersion
+from recipes.shopping_list import apply_deltas, rebuild
+from .fixtures import create_ingredients, create_recipe, create_user
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTest(APITestCase):
+    '''Тесты выгрузки списка покупок.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        author = create_user('author')
+        ingredients = create_ingredients(8)
+        cls.recipes = [
+            create_recipe(author, ingredients[index % 4:index % 4 + 4])
+            for index in range(40)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, recipes):
+        for recipe in recipes:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def download(self):
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        '''Число запросов выгрузки не растет с размером корзины.'''
+        self.fill_cart(self.recipes[:1])
+        with CaptureQueriesContext(connection) as small_cart:
+            self.download()
+
+        self.fill_cart(self.recipes[1:])
+        with self.assertNumQueries(len(small_cart)):
+            content = self.download()
+        self.assertEqual(len(content.splitlines()), 7)
+
+
+class ExportFormatsTest(APITestCase):
+    '''Тесты форматов выгрузки списка покупок и ETag.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('buyer')
+        author = create_user('author')
+        cls.ingredients = create_ingredients(2, prefix='Соль')
+        cls.recipe = create_recipe(author, cls.ingredients, amount=1045)
+        cls.other = create_recipe(author, cls.ingredients[:1], amount=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+
+    def download(self, export_format, **headers):
+        return self.client.get(
+            DOWNLOAD_URL, {'format': export_format}, **headers
+        )
+
+    def get_content(self, export_format):
+        response = self.download(export_format)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'shopping_list.{export_format}',
+            response['Content-Disposition']
+        )
+        return b''.join(response.streaming_content)
+
+    def test_txt(self):
+        self.assertEqual(
+            self.get_content('txt').decode(),
+            'Соль 000 (г) — 1045.00\nСоль 001 (г) — 1045.00'
+        )
+
+    def test_csv(self):
+        self.assertEqual(
+            self.get_content('csv').decode(),
+            '\ufeffИнгредиент,Единица измерения,Количество\r\n'
+            'Соль 000,г,1045\r\nСоль 001,г,1045\r\n'
+        )
+
+    def test_json(self):
+        self.assertEqual(json.loads(self.get_content('json')), [
+            {'name': 'Соль 000', 'measurement_unit': 'г', 'amount': 1045},
+            {'name': 'Соль 001', 'measurement_unit': 'г', 'amount': 1045},
+        ])
+
+    def test_pdf_embeds_font(self):
+        content = self.get_content('pdf')
+        self.assertTrue(content.startswith(b'%PDF-'))
+        self.assertIn(b'+DejaVuSans', content)
+        self.assertIn(b'/FontFile2', content)
+        self.assertNotIn(b'/Helvetica', content)
+
+    def test_pdf_is_deterministic(self):
+        self.assertEqual(self.get_content('pdf'), self.get_content('pdf'))
+
+    def test_pdf_pages_are_written_incrementally(self):
+        writer = PDFWriter()
+        writer.start()
+        row = ('Соль', 'г', Decimal('1.00'))
+        written = [bool(writer.write(row)) for _ in range(100)]
+        self.assertEqual(written.count(True), 2)
+        self.assertTrue(writer.finish().endswith(b'%%EOF\n'))
+
+    def test_etag_changes_with_shopping_list(self):
+        etag = self.download('txt')['ETag']
+        self.assertEqual(
+            self.download('txt', HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.assertNotEqual(self.download('csv')['ETag'], etag)
+
+        self.client.post(f'/api/recipes/{self.other.id}/shopping_cart/')
+        response = self.download('txt', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.client.delete('/api/recipes/shopping_cart/clear/')
+        self.assertNotEqual(self.download('txt')['ETag'], etag)
+
+    def test_profile_save_does_not_restore_old_etag(self):
+        old_etag = self.download('txt')['ETag']
+        self.client.post(f'/api/recipes/{self.other.id}/shopping_cart/')
+        etag = self.download('txt')['ETag']
+
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response = self.download('txt', HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+
+
+class ApplyDeltasTest(TestCase):
+    '''Тесты инкрементального списка покупок.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user('first'), create_user('second')]
+        cls.ingredients = create_ingredients(3)
+
+    def get_items(self):
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            )
+        }
+
+    def test_upsert_creates_and_increments(self):
+        first, second = (user.id for user in self.users)
+        salt, pepper, sugar = (item.id for item in self.ingredients)
+        apply_deltas([first], {salt: 5})
+        with CaptureQueriesContext(connection) as queries:
+            apply_deltas([first, second], {salt: 3, pepper: 2, sugar: 0})
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries
+             if 'SAVEPOINT' not in query['sql']],
+            ['INSERT', 'INSERT']
+        )
+        self.assertEqual(self.get_items(), {
+            (first, salt): 8, (first, pepper): 2,
+            (second, salt): 3, (second, pepper): 2,
+        })
+
+    def test_decrement_removes_empty_rows(self):
+        first, _ = (user.id for user in self.users)
+        salt, pepper, _ = (item.id for item in self.ingredients)
+        apply_deltas([first], {salt: 5, pepper: 2})
+        apply_deltas([first], {salt: -3, pepper: -2})
+        self.assertEqual(self.get_items(), {(first, salt): 2})
+
+    def get_versions(self):
+        return dict(ShoppingListVersion.objects.values_list(
+            'user_id', 'version'
+        ))
+
+    def test_versions_grow_with_every_change(self):
+        first, second = (user.id for user in self.users)
+        salt = self.ingredients[0].id
+        apply_deltas([first], {salt: 5})
+        apply_deltas([first, second], {salt: -5})
+        apply_deltas([first], {})
+        self.assertEqual(self.get_versions(), {first: 2, second: 1})
+
+    def test_rebuild_bumps_changed_lists(self):
+        first, _ = (user.id for user in self.users)
+        apply_deltas([first], {self.ingredients[0].id: 5})
+        rebuild()
+        self.assertEqual(self.get_items(), {})
+        self.assertEqual(self.get_versions(), {first: 2})
@@ -5,7 +5,8 @@ from djoser.views import TokenCreateView, TokenDestroyView
 
 
 from .views import (
-    AddFavoriteView, AddToShoppingCart, ChangePasswordViewSet,
+    AddFavoriteView, AddToShoppingCart, BatchFavoriteViewSet,
+    BatchShoppingCartViewSet, ChangePasswordViewSet,
     CurrentUserViewSet, DownloadShoppingCart,
     IngredientViewSet, RecipeViewSet, TagViewSet,
     UserDetailView, UserSubscriptionListAPIView, UserViewSet
@@ -45,6 +46,15 @@ urlpatterns = [
         UserSubscriptionListAPIView.as_view(),
         name='subscribe-unsubscribe'
     ),
+    path('recipes/favorite/', BatchFavoriteViewSet.as_view(
+        {'post': 'add', 'delete': 'remove'}
+    )),
+    path('recipes/shopping_cart/', BatchShoppingCartViewSet.as_view(
+        {'post': 'add', 'delete': 'remove'}
+    )),
+    path('recipes/shopping_cart/clear/', BatchShoppingCartViewSet.as_view(
+        {'delete': 'clear'}
+    )),
     path('recipes/<int:id>/favorite/', AddFavoriteView.as_view()),
     path('recipes/<int:id>/shopping_cart/', AddToShoppingCart.as_view()),
     path('recipes/download_shopping_cart/', DownloadShoppingCart.as_view(
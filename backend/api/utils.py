@@ -1,22 +1,32 @@
-def gen_shopping_list(user):
-    '''Метод формирования списка покупок.'''
-    ingredients = {}
+from recipes.constants import LIMIT_RECIPES
+from recipes.models import ShoppingListItem
+
 
-    shopping_carts = user.shopping_user.all()
+def get_shopping_list(user):
+    '''Метод получения queryset строк списка покупок.
 
-    for cart_item in shopping_carts:
-        recipe = cart_item.recipe
+    Список читается из поддерживаемой инкрементально таблицы
+    ShoppingListItem упорядоченными строками
+    (name, measurement_unit, amount). Строки именованные: в Django 4.2
+    aiterator() поддерживает values_list только с named=True.
+    '''
+    return (
+        ShoppingListItem.objects
+        .filter(user=user)
+        .values_list(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount', named=True
+        )
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
 
-        for recipe_ingredient in recipe.recipe_ingredients_set.all():
-            ingredient = recipe_ingredient.ingredient
-            ingredient_name = ingredient.name
-            ingredient_amount = recipe_ingredient.amount
-            ingredient_measurement_unit = ingredient.measurement_unit
 
-            key = f'{ingredient_name} ({ingredient_measurement_unit})'
-            if key in ingredients:
-                ingredients[key] += ingredient_amount
-            else:
-                ingredients[key] = ingredient_amount
+def gen_shopping_list(user):
+    '''Метод формирования списка покупок итератором строк.'''
+    return get_shopping_list(user).iterator()
+
 
-    return ingredients
+def get_recipes_limit(request):
+    '''Метод получения лимита рецептов автора из параметров запроса.'''
+    limit = request.query_params.get('recipes_limit')
+    return int(limit) if limit and limit.isdigit() else LIMIT_RECIPES
@@ -1,12 +1,22 @@
+import json
+
 from django.contrib.auth.hashers import make_password
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import (
+    Http404, HttpResponseNotModified, QueryDict, StreamingHttpResponse
+)
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import status, viewsets
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import (
     ListAPIView, RetrieveAPIView, get_object_or_404
 )
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (
     IsAuthenticated, IsAuthenticatedOrReadOnly
 )
@@ -14,21 +24,39 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from users.models import CustomUser
+from recipes.counters import create_counted, delete_counted
+from recipes.shopping_list import (
+    apply_deltas, bump_versions, recipe_amounts
+)
 from recipes.models import (
-    Favorite, Ingredient, Recipe, ShoppingCart, Subscription, Tag
+    Favorite, Ingredient, Recipe, ShoppingCart, ShoppingListItem,
+    ShoppingListVersion, Subscription, Tag
+)
+from .async_views import AsyncReadMixin
+from .cache import (
+    CATALOG_VERSION_KEY, CatalogCacheMixin, RecipePageCacheMixin,
+    aget_version, get_version
+)
+from .exports import (
+    ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+    ShoppingListPDFRenderer, ShoppingListTextRenderer
 )
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPagination
+from .ingredient_index import ingredient_index
+from .pagination import AsyncPageNumberPagination, RecipePagination
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
 from .serializers import (
     ChangePasswordSerializer, FavoriteSerializer, IngredientSerializer,
-    RecipeReadSerializer, RecipeWriteSerializer, ShoppingCartSerializer,
+    RecipeIdsSerializer, RecipeReadSerializer, RecipeWriteSerializer,
+    ShoppingCartSerializer,
     SubscriptionCreateSerializer, SubscriptionSerialiazer, TagSerializer,
     UserSerializer
 )
-from .utils import gen_shopping_list
+from .utils import gen_shopping_list, get_recipes_limit, get_shopping_list
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CatalogCacheMixin, AsyncReadMixin, viewsets.ModelViewSet):
     '''Вьюсет модели Tag.'''
 
     queryset = Tag.objects.all()
@@ -37,7 +65,9 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(
+    CatalogCacheMixin, AsyncReadMixin, viewsets.ModelViewSet
+):
     '''Вьюсет модели Ingredient.'''
 
     queryset = Ingredient.objects.all()
@@ -48,21 +78,83 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        '''Метод поиска ингредиентов по началу названия через индекс.'''
+        if 'name' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(request, self.search)
+
+    def search(self, request):
+        '''Метод формирования ответа из индекса ингредиентов.'''
+        return Response(
+            ingredient_index.search(request.query_params['name'])
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        '''Асинхронный метод поиска ингредиентов через индекс.'''
+        if 'name' not in request.query_params:
+            return await super().alist(request, *args, **kwargs)
+        return await self.aget_cached_response(request, self.asearch)
+
+    async def asearch(self, request):
+        '''Асинхронный метод формирования ответа из индекса.'''
+        return Response(
+            await ingredient_index.asearch(request.query_params['name'])
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    RecipePageCacheMixin, AsyncReadMixin, viewsets.ModelViewSet
+):
     '''Вьюсет списка модели Recipe.'''
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeReadSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    parser_classes = (ORJSONParser, MultiPartParser)
+
+    def get_queryset(self):
+        '''Метод получения рецептов с флагами текущего юзера.
+
+        При выборочных полях ответа (?fields=, ?omit=) не подгружаются
+        связи и флаги, которых нет в ответе, и не читается текст рецепта.
+        '''
+        user = self.request.user
+        fields = RecipeReadSerializer.get_requested_fields(self.request)
+        queryset = super().get_queryset().defer('search_vector')
+        if fields is not None and 'text' not in fields:
+            queryset = queryset.defer('text')
+        return queryset.with_related(user, fields).with_user_flags(
+            user, fields
+        )
+
+    def get_write_data(self, request):
+        '''Метод получения данных рецепта из JSON или multipart запроса.
+
+        В multipart запросе картинка приходит файлом, а ингредиенты и
+        теги - JSON-строками (теги также можно передать списком полей).
+        '''
+        if not isinstance(request.data, QueryDict):
+            return request.data
+        data = request.data.dict()
+        for field in ('ingredients', 'tags'):
+            value = data.get(field)
+            if isinstance(value, str) and value.startswith('['):
+                try:
+                    data[field] = json.loads(value)
+                except ValueError:
+                    raise ParseError(f'Некорректный JSON в поле {field}.')
+        if 'tags' in data and not isinstance(data['tags'], list):
+            data['tags'] = request.data.getlist('tags')
+        return data
 
     def create(self, request, *args, **kwargs):
         '''Метод создания нового рецепта.'''
         serializer = RecipeWriteSerializer(
-            data=request.data, context={'request': request}
+            data=self.get_write_data(request), context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -72,11 +164,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         '''Метод обновления данных в рецептe по id.'''
         instance = self.get_object()
         serializer = RecipeWriteSerializer(
-            instance, data=request.data, context={'request': request},
-            partial=True
+            instance, data=self.get_write_data(request),
+            context={'request': request}, partial=True
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        instance._prefetched_objects_cache = {}
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
@@ -103,7 +196,10 @@ class AddFavoriteView(APIView):
 
     def delete(self, request, id):
         '''Метод удаления рецепта из избранного.'''
-        get_object_or_404(Favorite, user=request.user, recipe_id=id).delete()
+        if not delete_counted(
+            Favorite.objects.filter(user=request.user, recipe_id=id)
+        ):
+            raise Http404
         return Response(
             'Рецепт успешно удален из избранного',
             status=status.HTTP_204_NO_CONTENT
@@ -127,36 +223,229 @@ class AddToShoppingCart(APIView):
 
     def delete(self, request, id):
         '''Метод удаления рецепта из списка покупок.'''
-        get_object_or_404(
-            ShoppingCart, user=request.user, recipe_id=id
-        ).delete()
+        with transaction.atomic():
+            if not delete_counted(
+                ShoppingCart.objects.filter(user=request.user, recipe_id=id)
+            ):
+                raise Http404
+            apply_deltas([request.user.id], recipe_amounts([id], sign=-1))
         return Response(
             'Рецепт удален из списка покупок.',
             status=status.HTTP_204_NO_CONTENT
         )
 
 
-class DownloadShoppingCart(viewsets.ViewSet):
-    '''Вьюсет загрузки списка покупок.'''
+class BatchRecipeListViewSet(viewsets.ViewSet):
+    '''Базовый вьюсет пакетного добавления и удаления рецептов юзера.
+
+    Добавление выполняется одним INSERT ... ON CONFLICT DO NOTHING
+    RETURNING, удаление - одним DELETE ... RETURNING. Счетчики и
+    производные данные обновляются по строкам, которые действительно
+    вставлены или удалены этим запросом. В ответе возвращается статус
+    по каждому переданному id.
+    '''
 
+    model = None
     permission_classes = [IsAuthenticated]
 
+    def get_recipe_ids(self, request):
+        '''Метод получения уникальных id рецептов из тела запроса.'''
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def check_recipe(self, user, author_id):
+        '''Метод дополнительной проверки рецепта, возвращает статус ошибки.'''
+        return None
+
+    def after_add(self, user, recipe_ids):
+        '''Метод обработки добавленных рецептов.'''
+
+    def after_remove(self, user, recipe_ids):
+        '''Метод обработки удаленных рецептов.'''
+
+    def add(self, request):
+        '''Метод пакетного добавления рецептов.'''
+        recipe_ids = self.get_recipe_ids(request)
+        authors = dict(
+            Recipe.objects.filter(id__in=recipe_ids).values_list(
+                'id', 'author_id'
+            )
+        )
+        errors = {}
+        for recipe_id in recipe_ids:
+            if recipe_id not in authors:
+                errors[recipe_id] = 'not_found'
+            else:
+                error = self.check_recipe(request.user, authors[recipe_id])
+                if error:
+                    errors[recipe_id] = error
+
+        with transaction.atomic():
+            added = create_counted([
+                self.model(user=request.user, recipe_id=recipe_id)
+                for recipe_id in recipe_ids if recipe_id not in errors
+            ])
+            if added:
+                self.after_add(request.user, added)
+        added = set(added)
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': errors.get(recipe_id) or (
+                    'added' if recipe_id in added else 'already_exists'
+                )
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    def remove(self, request):
+        '''Метод пакетного удаления рецептов.'''
+        recipe_ids = self.get_recipe_ids(request)
+        with transaction.atomic():
+            removed = delete_counted(self.model.objects.filter(
+                user=request.user, recipe_id__in=recipe_ids
+            ))
+            if removed:
+                self.after_remove(request.user, removed)
+        removed = set(removed)
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': 'removed' if recipe_id in removed else 'not_found'
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+
+class BatchFavoriteViewSet(BatchRecipeListViewSet):
+    '''Вьюсет пакетной работы с избранным.'''
+
+    model = Favorite
+
+    def check_recipe(self, user, author_id):
+        '''Метод запрета добавления своего рецепта в избранное.'''
+        if author_id == user.id:
+            return 'own_recipe'
+        return None
+
+
+class BatchShoppingCartViewSet(BatchRecipeListViewSet):
+    '''Вьюсет пакетной работы со списком покупок.'''
+
+    model = ShoppingCart
+
+    def after_add(self, user, recipe_ids):
+        '''Метод добавления ингредиентов рецептов в список покупок.'''
+        apply_deltas([user.id], recipe_amounts(recipe_ids))
+
+    def after_remove(self, user, recipe_ids):
+        '''Метод вычитания ингредиентов рецептов из списка покупок.'''
+        apply_deltas([user.id], recipe_amounts(recipe_ids, sign=-1))
+
+    def clear(self, request):
+        '''Метод очистки списка покупок.'''
+        with transaction.atomic():
+            delete_counted(request.user.shopping_user.all())
+            ShoppingListItem.objects.filter(user=request.user).delete()
+            bump_versions([request.user.id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DownloadShoppingCart(AsyncReadMixin, viewsets.ViewSet):
+    '''Вьюсет потоковой выгрузки списка покупок.
+
+    Формат выбирается параметром ?format=txt|csv|json|pdf или
+    заголовком Accept, по умолчанию txt. Строки списка, уже
+    сгруппированные по ингредиентам и отсортированные по названию,
+    кодируются по мере чтения из БД. ETag строится по версии списка
+    юзера (ShoppingListVersion), которую увеличивает каждое изменение
+    списка, и поколению справочников, поэтому повторная выгрузка без
+    изменений отдает 304 без чтения списка. Ошибки отдаются в JSON при
+    любом формате.
+    '''
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [
+        ShoppingListTextRenderer, ShoppingListCSVRenderer,
+        ShoppingListJSONRenderer, ShoppingListPDFRenderer,
+    ]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if isinstance(response, Response):
+            request.accepted_renderer = ORJSONRenderer()
+            request.accepted_media_type = ORJSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_file_response(self, request, file_content, etag):
+        '''Метод формирования потокового ответа с файлом списка.'''
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            renderer = request.accepted_renderer
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += '; charset={}'.format(renderer.charset)
+            response = StreamingHttpResponse(
+                file_content, content_type=content_type
+            )
+            response['Content-Disposition'] = (
+                'attachment; filename="{}"'.format(renderer.get_filename())
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def get_version_queryset(self, request):
+        '''Метод получения queryset версии списка юзера.'''
+        return ShoppingListVersion.objects.filter(
+            user=request.user
+        ).values_list('version', flat=True)
+
+    def make_etag(self, request, version, catalog_version):
+        '''Метод формирования ETag по версиям списка и справочников.'''
+        return '"{}-{}-{}"'.format(
+            version or 0, catalog_version, request.accepted_renderer.format
+        )
+
+    def get_etag(self, request):
+        '''Метод получения ETag выгрузки.
+
+        Версия читается до чтения списка: если список изменится между
+        ними, ETag окажется устаревшим и следующая выгрузка просто
+        вернет файл заново.
+        '''
+        return self.make_etag(
+            request, self.get_version_queryset(request).first(),
+            get_version(CATALOG_VERSION_KEY)
+        )
+
     def list(self, request):
         '''Метод для обработки Get запросов.'''
+        etag = self.get_etag(request)
+        return self.get_file_response(
+            request,
+            request.accepted_renderer.stream(gen_shopping_list(request.user)),
+            etag
+        )
 
-        ingredients = gen_shopping_list(request.user)
+    async def alist(self, request):
+        '''Асинхронный метод выгрузки списка покупок.
 
-        file_content = '\n'.join(
-            [f'{ingredient} — {amount}'
-             for ingredient, amount in ingredients.items()]
+        Строки читаются aiterator() и кодируются асинхронным
+        генератором, поэтому медленный клиент не занимает поток.
+        '''
+        etag = self.make_etag(
+            request, await self.get_version_queryset(request).afirst(),
+            await aget_version(CATALOG_VERSION_KEY)
         )
-
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+        return self.get_file_response(
+            request,
+            request.accepted_renderer.astream(
+                get_shopping_list(request.user).aiterator()
+            ),
+            etag
         )
-        response.write(file_content)
-        return response
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -217,16 +506,46 @@ class ChangePasswordViewSet(viewsets.ViewSet):
             )
 
 
-class UserSubscriptionListAPIView(ListAPIView):
+class UserSubscriptionListAPIView(AsyncReadMixin, ListAPIView):
     '''Вьюсет для получения списка подписок.'''
 
     serializer_class = SubscriptionSerialiazer
     permission_classes = [IsAuthenticated]
-    pagination_class = PageNumberPagination
+    pagination_class = AsyncPageNumberPagination
 
     def get_queryset(self):
-        '''Метод получения подписок юзера.'''
-        return self.request.user.follower.all()
+        '''Метод получения подписок юзера.
+
+        Первые recipes_limit рецептов каждого автора выбираются одним
+        запросом с оконной функцией ROW_NUMBER() OVER (PARTITION BY
+        author_id), количество рецептов берется из счетчика автора.
+        Если рецепты исключены из ответа (?fields=, ?omit=), они не
+        выбираются.
+        '''
+        queryset = self.request.user.follower.select_related(
+            'author'
+        ).order_by('id')
+        fields = SubscriptionSerialiazer.get_requested_fields(self.request)
+        if fields is not None and 'recipes' not in fields:
+            return queryset
+        limited_recipes = Recipe.objects.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('created').desc()
+            )
+        ).filter(row_number__lte=get_recipes_limit(self.request))
+        return queryset.prefetch_related(
+            Prefetch(
+                'author__author_recipes',
+                queryset=limited_recipes,
+                to_attr='limited_recipes'
+            )
+        )
+
+    async def aget(self, request, *args, **kwargs):
+        '''Асинхронный метод получения списка подписок.'''
+        return await self.alist(request, *args, **kwargs)
 
     def post(self, request, id):
         '''Метод создания подписки по id.'''
@@ -240,10 +559,10 @@ class UserSubscriptionListAPIView(ListAPIView):
 
     def delete(self, request, id):
         '''Метод удаления подписки по id.'''
-        subscription = get_object_or_404(
-            Subscription, user=request.user, author_id=id
-        )
-        subscription.delete()
+        if not delete_counted(
+            Subscription.objects.filter(user=request.user, author_id=id)
+        ):
+            raise Http404
         return Response(
             'Подписки не существует', status=status.HTTP_204_NO_CONTENT
         )
@@ -0,0 +1,71 @@
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .router import read_alias
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinningMiddleware:
+    '''Middleware выбора реплики для чтения с привязкой после записи.
+
+    Безопасный запрос читает с одной случайно выбранной реплики. После
+    успешного небезопасного запроса клиенту ставится cookie, и в
+    течение REPLICA_STICKY_SECONDS его запросы читают с основной БД,
+    чтобы он видел свои изменения без учета задержки репликации. Без
+    настроенных реплик исключается из цепочки middleware.
+    '''
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def get_read_alias(self, request):
+        '''Метод выбора БД для чтения в запросе.'''
+        if (
+            request.method not in SAFE_METHODS
+            or self.cookie_name in request.COOKIES
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def pin_to_primary(self, request, response):
+        '''Метод привязки клиента к основной БД после записи.'''
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax'
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_alias.set(self.get_read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin_to_primary(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(self.get_read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.pin_to_primary(request, response)
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def primary_reads():
+    '''Контекст чтения с основной БД в запросе, читающем с реплики.
+
+    Нужен для чтений, результат которых сохраняется в общий кэш под
+    новым поколением: отстающая реплика вернула бы старые строки.
+    '''
+    token = read_alias.set(None)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+class ReplicaRouter:
+    '''Роутер чтения с реплик и записи в основную БД.
+
+    Реплика для чтения выбирается на запрос в PrimaryPinningMiddleware.
+    Вне запросов (команды управления), в небезопасных запросах, после
+    недавней записи клиента и внутри транзакции основной БД чтение идет
+    с основной БД. Миграции применяются только к основной БД.
+    '''
+
+    def db_for_read(self, model, **hints):
+        '''Метод выбора БД для чтения.'''
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        '''Метод выбора БД для записи.'''
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        '''Метод проверки связей между объектами основной БД и реплик.'''
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        '''Метод запрета миграций на репликах.'''
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -6,7 +6,7 @@ from django.forms.models import BaseInlineFormSet
 
 from .models import (
     Favorite, Ingredient, Recipe, RecipeIngredient,
-    ShoppingCart, Subscription, Tag
+    ShoppingCart, ShoppingListItem, Subscription, Tag
 )
 from recipes.constants import MIN_INGREDIENTS_VALUE
 
@@ -90,7 +90,7 @@ class RecipeIngredientInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('name', 'author', 'tags')
-    list_display = ('name', 'total_favorites',)
+    list_display = ('name', 'favorites_count',)
     inlines = [RecipeIngredientInline]
 
 
@@ -189,3 +189,9 @@ class RecipeIngredientAdminForm(forms.ModelForm):
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     form = RecipeIngredientAdminForm
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    list_filter = ('user',)
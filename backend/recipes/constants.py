@@ -9,3 +9,11 @@ LIMIT_COLOR_FIELD = 7
 LIMIT_MODEL_FIELD = 50
 LIMIT_RECIPES = 3
 MIN_INGREDIENTS_VALUE = 1
+INGREDIENT_SEARCH_LIMIT = 50
+BASE64_CHUNK_SIZE = 64 * 1024
+BATCH_RECIPES_LIMIT = 100
+SEARCH_CONFIG = 'russian'
+IMAGE_VARIANTS = {'thumbnail': 160, 'card': 480, 'full': 1280}
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+IMAGE_VARIANT_QUALITY = 80
+EXPORT_CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,137 @@
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import CustomUser
+from .models import Favorite, Recipe, ShoppingCart, Subscription
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Subscription: (CustomUser, 'author_id', 'followers_count'),
+    Recipe: (CustomUser, 'author_id', 'recipes_count'),
+}
+
+
+def change_counter(sender, ids, delta):
+    '''Метод изменения счетчика связанных объектов на delta через F().
+
+    Значение не опускается ниже нуля: рассинхронизированный счетчик
+    не должен приводить к нарушению ограничения PositiveIntegerField.
+    '''
+    model, field, counter = COUNTERS[sender]
+    model.objects.filter(pk__in=ids).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
+
+
+def change_counts(sender, ids, sign):
+    '''Метод изменения счетчика на число вхождений id в ids.'''
+    counts = Counter(ids)
+    for count in set(counts.values()):
+        change_counter(
+            sender,
+            [pk for pk, value in counts.items() if value == count],
+            sign * count
+        )
+
+
+def insert_returning(objs, field):
+    '''Метод создания строк одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает значения field только действительно вставленных строк:
+    уже существующие (в том числе вставленные конкурентным запросом)
+    пропускаются. Сигналы сохранения не отправляются.
+    '''
+    if not objs:
+        return []
+    model = type(objs[0])
+    alias = router.db_for_write(model)
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    sql = (
+        'INSERT INTO {table} ({columns}) VALUES {values} '
+        'ON CONFLICT DO NOTHING RETURNING {field}'
+    ).format(
+        table=quote(opts.db_table),
+        columns=', '.join(quote(field.column) for field in fields),
+        values=', '.join(
+            ['({})'.format(', '.join(['%s'] * len(fields)))] * len(objs)
+        ),
+        field=quote(opts.get_field(field).column),
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for obj in objs for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_returning(queryset, field):
+    '''Метод удаления строк одним DELETE ... RETURNING.
+
+    Возвращает значения field только действительно удаленных строк:
+    строка, удаленная конкурентным запросом, в результат не попадает.
+    Сигналы удаления не отправляются.
+    '''
+    model = queryset.model
+    alias = router.db_for_write(model)
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    subquery, params = queryset.order_by().values('pk').query.get_compiler(
+        using=alias
+    ).as_sql()
+    sql = 'DELETE FROM {table} WHERE {pk} IN ({subquery}) RETURNING {field}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            table=quote(opts.db_table),
+            pk=quote(opts.pk.column),
+            subquery=subquery,
+            field=quote(opts.get_field(field).column),
+        ), params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_counted(queryset):
+    '''Метод удаления связей с уменьшением счетчика по удаленным строкам.
+
+    Возвращает список значений поля счетчика удаленных строк.
+    '''
+    _, field, _ = COUNTERS[queryset.model]
+    with transaction.atomic(using=router.db_for_write(queryset.model)):
+        ids = delete_returning(queryset, field)
+        change_counts(queryset.model, ids, -1)
+    return ids
+
+
+def create_counted(objs):
+    '''Метод создания связей с увеличением счетчика по вставленным строкам.
+
+    Возвращает список значений поля счетчика вставленных строк.
+    '''
+    if not objs:
+        return []
+    sender = type(objs[0])
+    _, field, _ = COUNTERS[sender]
+    with transaction.atomic(using=router.db_for_write(sender)):
+        ids = insert_returning(objs, field)
+        change_counts(sender, ids, 1)
+    return ids
+
+
+def recount(sender):
+    '''Метод пересчета счетчика одним UPDATE по всем объектам.'''
+    model, field, counter = COUNTERS[sender]
+    counts = sender.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return model.objects.update(
+        **{counter: Coalesce(Subquery(counts), 0)}
+    )
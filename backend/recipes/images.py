@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from .constants import (
+    IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY, IMAGE_VARIANTS
+)
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Варианты фото рецепта (sender - Recipe) записаны через update() в обход
+# сигналов моделей.
+variants_generated = Signal()
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_executor():
+    '''Метод получения пула фоновых потоков, создаваемого при первой задаче.'''
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix='image-variants'
+            )
+        return executor
+
+
+def variant_name(source, variant, image_format):
+    '''Метод получения имени файла варианта рядом с оригиналом.'''
+    stem, _ = os.path.splitext(source)
+    extension = 'jpg' if image_format == 'jpeg' else image_format
+    return f'{stem}_{variant}.{extension}'
+
+
+def render_variant(image, size, image_format):
+    '''Метод уменьшения картинки и кодирования в нужный формат.'''
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    if image_format == 'jpeg' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    buffer = BytesIO()
+    variant.save(
+        buffer, IMAGE_VARIANT_FORMATS[image_format],
+        quality=IMAGE_VARIANT_QUALITY, optimize=True
+    )
+    return buffer.getvalue()
+
+
+def get_variant_names(variants):
+    '''Метод получения имен всех файлов вариантов.'''
+    return {
+        name
+        for variant in IMAGE_VARIANTS
+        for name in (variants or {}).get(variant, {}).values()
+    }
+
+
+def delete_variants(variants, keep=()):
+    '''Метод удаления файлов вариантов, кроме перечисленных в keep.'''
+    for name in get_variant_names(variants) - set(keep):
+        default_storage.delete(name)
+
+
+def generate_variants(recipe_id, force=False):
+    '''Метод генерации вариантов картинки рецепта.
+
+    Варианты thumbnail, card и full в WebP и JPEG сохраняются рядом с
+    оригиналом под свободными именами хранилища и записываются в
+    Recipe.image_variants вместе с именем исходного файла. Если картинка
+    уже обработана (и не передан force), ничего не делается; варианты
+    прежней картинки удаляются.
+    '''
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    previous = recipe.image_variants or {}
+    if previous.get('source') == source and not force:
+        return
+
+    with default_storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    variants = {'source': source}
+    for variant, size in IMAGE_VARIANTS.items():
+        variants[variant] = {}
+        for image_format in IMAGE_VARIANT_FORMATS:
+            variants[variant][image_format] = default_storage.save(
+                variant_name(source, variant, image_format),
+                ContentFile(render_variant(image, size, image_format))
+            )
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_variants=variants
+    )
+    if updated:
+        variants_generated.send(sender=Recipe, recipe_id=recipe_id)
+        delete_variants(previous, keep=get_variant_names(variants))
+    else:
+        delete_variants(variants)
+
+
+def run_in_background(function, *args):
+    '''Метод выполнения задачи в фоновом потоке с закрытием соединений.'''
+
+    def task():
+        try:
+            function(*args)
+        except Exception:
+            logger.exception('Ошибка обработки картинки рецепта.')
+        finally:
+            close_old_connections()
+
+    get_executor().submit(task)
+
+
+def schedule_variants(recipe_id):
+    '''Метод постановки генерации вариантов после коммита транзакции.'''
+    transaction.on_commit(
+        lambda: run_in_background(generate_variants, recipe_id)
+    )
@@ -0,0 +1,21 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db.backends.ddl_references import Statement
+
+
+class PostgresGinIndex(GinIndex):
+    '''GIN индекс, который создается только в PostgreSQL.
+
+    В других БД (SQLite при локальной разработке) вместо DDL индекса
+    выполняется пустой запрос, в том числе когда миграция пересоздает
+    таблицу: поиск там работает без индексов.
+    '''
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().remove_sql(model, schema_editor, **kwargs)
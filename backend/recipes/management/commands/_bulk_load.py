@@ -0,0 +1,67 @@
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.signals import catalog_loaded
+
+BATCH_SIZE = 500
+
+
+class BulkLoadCommand(ABC, BaseCommand):
+    '''Базовая команда пакетной загрузки справочника в БД.
+
+    Строки читаются из файла потоком и вставляются пачками через
+    bulk_create(ignore_conflicts=True), поэтому повторный запуск
+    пропускает уже загруженные записи по ограничениям уникальности.
+    Вся загрузка выполняется в одной транзакции.
+    '''
+    model = None
+    default_path = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=self.default_path,
+            help=f'Путь к файлу данных (по умолчанию {self.default_path}).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Размер пачки для вставки (по умолчанию {BATCH_SIZE}).'
+        )
+
+    @abstractmethod
+    def read_objects(self, path):
+        '''Метод построчного чтения объектов модели из файла.'''
+
+    def handle(self, *args, **options):
+        '''Метод пакетной загрузки данных.'''
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть больше 0.')
+
+        total = 0
+        try:
+            with transaction.atomic():
+                count_before = self.model.objects.count()
+                objects = self.read_objects(path)
+                while True:
+                    batch = list(islice(objects, batch_size))
+                    if not batch:
+                        break
+                    self.model.objects.bulk_create(
+                        batch, batch_size=batch_size, ignore_conflicts=True
+                    )
+                    total += len(batch)
+                inserted = self.model.objects.count() - count_before
+        except OSError as error:
+            raise CommandError(f'Ошибка чтения файла {path}: {error}')
+
+        if inserted:
+            catalog_loaded.send(sender=self.model)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Успешная загрузка данных из {path}: '
+            f'добавлено {inserted}, пропущено {total - inserted}.'
+        ))
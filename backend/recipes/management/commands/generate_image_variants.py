@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    '''Команда генерации уменьшенных копий фото рецептов.
+
+    Обрабатывает рецепты, у которых копии отсутствуют или сделаны для
+    прежнего фото, например загруженные до появления вариантов или
+    не обработанные из-за перезапуска воркера.
+    '''
+    help = 'Генерация уменьшенных копий фото рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии для всех рецептов.'
+        )
+
+    def handle(self, *args, **options):
+        '''Метод генерации копий.'''
+        processed = 0
+        for recipe in Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).only('image', 'image_variants').iterator():
+            if not options['force'] and (
+                recipe.image_variants.get('source') == recipe.image.name
+            ):
+                continue
+            try:
+                generate_variants(recipe.pk, force=options['force'])
+            except Exception as error:
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+                continue
+            processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано рецептов: {processed}.')
+        )
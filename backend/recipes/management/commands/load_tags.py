@@ -1,35 +1,17 @@
 import csv
 
-from django.core.management.base import BaseCommand
-
 from recipes.models import Tag
+from ._bulk_load import BulkLoadCommand
 
 
-class Command(BaseCommand):
+class Command(BulkLoadCommand):
     '''Команда для загрузки данных о тегах из CSV в БД.'''
     help = 'Загрузка данных тегов из CSV файла'
-
-    def handle(self, *args, **kwargs):
-        csv_file_path = 'data/tags.csv'
-
-        with open(csv_file_path, encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            for row in reader:
-                name = row[0]
-                color = row[1]
-                slug = row[2]
-
-                tag, created = Tag.objects.get_or_create(
-                    name=name,
-                    color=color,
-                    slug=slug,
-                )
-
-                if created:
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Тег "{name}" успешно создан.')
-                    )
-
-            self.stdout.write(
-                self.style.SUCCESS('Успешная загрузка данных из CSV.')
-            )
+    model = Tag
+    default_path = 'data/tags.csv'
+
+    def read_objects(self, path):
+        '''Метод чтения тегов из CSV.'''
+        with open(path, encoding='utf-8') as csv_file:
+            for name, color, slug in csv.reader(csv_file):
+                yield Tag(name=name, color=color, slug=slug)
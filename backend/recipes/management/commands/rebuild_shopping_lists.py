@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    '''Команда пересчета списков покупок по корзинам юзеров.'''
+    help = 'Полный пересчет таблицы ShoppingListItem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        '''Метод пересчета списков покупок.'''
+        created = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны: {created} строк.'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    '''Команда пересчета денормализованных счетчиков.'''
+    help = 'Пересчет счетчиков избранного, покупок, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        '''Метод пересчета всех счетчиков.'''
+        with transaction.atomic():
+            for sender, (model, _, counter) in COUNTERS.items():
+                updated = recount(sender)
+                self.stdout.write(
+                    f'{model.__name__}.{counter}: обновлено {updated}.'
+                )
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,183 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import COUNTERS, recount
+from recipes.search import update_search_vector
+from recipes.shopping_list import rebuild
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription, Tag
+)
+from users.models import CustomUser
+
+BATCH_SIZE = 1000
+
+
+def zipf_weights(size, alpha):
+    '''Метод получения весов степенного распределения по рангу.'''
+    return [1 / (rank ** alpha) for rank in range(1, size + 1)]
+
+
+def sample_pairs(rng, users, targets, per_user, alpha, exclude=None):
+    '''Метод выборки уникальных пар (юзер, объект) с популярными лидерами.
+
+    Количество объектов у юзера и популярность объектов распределены
+    по степенному закону со средним per_user объектов на юзера.
+    '''
+    weights = zipf_weights(len(targets), alpha)
+    user_weights = zipf_weights(len(users), alpha)
+    scale = per_user * len(users) / sum(user_weights)
+    pairs = set()
+    for user, user_weight in zip(users, user_weights):
+        count = min(len(targets), max(1, round(user_weight * scale)))
+        for target in rng.choices(targets, weights=weights, k=count):
+            if exclude is None or not exclude(user, target):
+                pairs.add((user.id, target.id))
+    return pairs
+
+
+def is_own_recipe(user, recipe):
+    '''Метод проверки, что рецепт принадлежит юзеру.'''
+    return recipe.author_id == user.id
+
+
+def is_self(user, author):
+    '''Метод проверки подписки на самого себя.'''
+    return user.id == author.id
+
+
+class Command(BaseCommand):
+    '''Команда генерации синтетических данных для бенчмарков.'''
+    help = 'Генерация пользователей, рецептов, избранного, корзин и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument(
+            '--favorites-per-user', type=int, default=20,
+            help='Среднее число рецептов в избранном у юзера.'
+        )
+        parser.add_argument(
+            '--carts-per-user', type=int, default=8,
+            help='Среднее число рецептов в корзине у юзера.'
+        )
+        parser.add_argument(
+            '--subscriptions-per-user', type=int, default=10,
+            help='Среднее число подписок у юзера.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения популярности.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        '''Метод генерации данных.'''
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        alpha = options['alpha']
+
+        ingredients = list(Ingredient.objects.only('id'))
+        tags = list(Tag.objects.only('id'))
+        if not ingredients or not tags:
+            raise CommandError(
+                'Сначала загрузите справочники: load_ingredients, load_tags.'
+            )
+        if CustomUser.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).exists():
+            raise CommandError(
+                f'Данные с префиксом {prefix} уже созданы, '
+                'укажите другой --prefix.'
+            )
+
+        with transaction.atomic():
+            password = make_password(prefix)
+            CustomUser.objects.bulk_create((
+                CustomUser(
+                    email=f'{prefix}_{number}@example.com',
+                    username=f'{prefix}_{number}',
+                    first_name='Имя',
+                    last_name='Фамилия',
+                    password=password,
+                )
+                for number in range(options['users'])
+            ), batch_size=batch_size)
+            users = list(CustomUser.objects.filter(
+                username__startswith=f'{prefix}_'
+            ).order_by('id'))
+            rng.shuffle(users)
+
+            authors = rng.choices(
+                users, weights=zipf_weights(len(users), alpha),
+                k=options['recipes']
+            )
+            Recipe.objects.bulk_create((
+                Recipe(
+                    author=author,
+                    name=f'{prefix} рецепт {number}',
+                    text='Описание рецепта. ' * rng.randint(5, 50),
+                    cooking_time=rng.randint(5, 240),
+                )
+                for number, author in enumerate(authors)
+            ), batch_size=batch_size)
+            recipes = list(Recipe.objects.filter(
+                name__startswith=f'{prefix} рецепт '
+            ).only('id', 'author_id'))
+            rng.shuffle(recipes)
+
+            tag_through = Recipe.tags.through
+            tag_through.objects.bulk_create((
+                tag_through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in recipes
+                for tag in rng.sample(tags, rng.randint(1, len(tags)))
+            ), batch_size=batch_size)
+            RecipeIngredient.objects.bulk_create((
+                RecipeIngredient(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient.id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in rng.sample(
+                    ingredients, min(len(ingredients), rng.randint(3, 15))
+                )
+            ), batch_size=batch_size)
+
+            Favorite.objects.bulk_create((
+                Favorite(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in sample_pairs(
+                    rng, users, recipes,
+                    options['favorites_per_user'], alpha, is_own_recipe
+                )
+            ), batch_size=batch_size)
+            ShoppingCart.objects.bulk_create((
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in sample_pairs(
+                    rng, users, recipes, options['carts_per_user'], alpha
+                )
+            ), batch_size=batch_size)
+            Subscription.objects.bulk_create((
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id, author_id in sample_pairs(
+                    rng, users, users,
+                    options['subscriptions_per_user'], alpha, is_self
+                )
+            ), batch_size=batch_size)
+
+            for sender in COUNTERS:
+                recount(sender)
+            rebuild(batch_size=batch_size)
+            update_search_vector(Recipe.objects.filter(
+                name__startswith=f'{prefix} рецепт '
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: юзеров {len(users)}, рецептов {len(recipes)}.'
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('Favorite', 'recipes', 'Recipe', 'recipe', 'favorites_count'),
+    ('ShoppingCart', 'recipes', 'Recipe', 'recipe', 'in_carts_count'),
+    ('Subscription', 'users', 'CustomUser', 'author', 'followers_count'),
+    ('Recipe', 'users', 'CustomUser', 'author', 'recipes_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for sender_name, app_label, model_name, field, counter in COUNTERS:
+        sender = apps.get_model('recipes', sender_name)
+        model = apps.get_model(app_label, model_name)
+        counts = sender.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+        model.objects.update(**{counter: Coalesce(Subquery(counts), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_recipe_author'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное.'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок.'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='tags',
+            field=models.ManyToManyField(related_name='recipes', to='recipes.tag', verbose_name='Название тега.'),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients_set', to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
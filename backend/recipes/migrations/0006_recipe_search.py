@@ -0,0 +1,46 @@
+# Generated by Django 4.2.3 on 2026-10-17 00:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+import recipes.indexes
+
+SEARCH_CONFIG = 'russian'
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shoppinglistitem'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор.'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=recipes.indexes.PostgresGinIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=recipes.indexes.PostgresGinIndex(django.contrib.postgres.indexes.OpClass('name', name='gin_trgm_ops'), name='recipe_name_trgm_gin'),
+        ),
+    ]
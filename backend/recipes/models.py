@@ -1,6 +1,8 @@
+from django.contrib.postgres.indexes import OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import Exists, OuterRef, Prefetch, UniqueConstraint
 from django.core.validators import (
     MaxValueValidator, MinValueValidator, RegexValidator
 )
@@ -11,6 +13,7 @@ from .constants import (
     LIMIT_MODEL_FIELD, LIMIT_NUMBER_WIDTH, MAX_COOKING_TIME,
     MAX_LENGTH, MAX_LENGTH_NAME_FIELD, MIN_COOKING_TIME
 )
+from .indexes import PostgresGinIndex
 from .validators import unique_color_validator
 
 
@@ -76,6 +79,59 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    '''QuerySet рецептов с оптимизированной выборкой связей.'''
+
+    def with_related(self, user=None, fields=None):
+        '''Метод подгрузки автора, тегов и ингредиентов рецептов.
+
+        Автор подгружается вместе с флагом подписки текущего юзера,
+        ингредиенты рецепта - вместе с самими ингредиентами, поэтому
+        число запросов не зависит от количества рецептов. Если передан
+        набор полей ответа fields, подгружаются только нужные связи.
+        '''
+        lookups = []
+        if fields is None or 'author' in fields:
+            authors = CustomUser.objects.all()
+            if user is not None and user.is_authenticated:
+                authors = authors.annotate(
+                    is_subscribed=Exists(
+                        Subscription.objects.filter(
+                            user=user, author=OuterRef('pk')
+                        )
+                    )
+                )
+            lookups.append(Prefetch('author', queryset=authors))
+        if fields is None or 'tags' in fields:
+            lookups.append('tags')
+        if fields is None or 'ingredients' in fields:
+            lookups.append(Prefetch(
+                'recipe_ingredients_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        return self.prefetch_related(*lookups)
+
+    def with_user_flags(self, user, fields=None):
+        '''Метод аннотации флагов избранного и списка покупок юзера.
+
+        Если передан набор полей ответа fields, аннотируются только
+        запрошенные флаги.
+        '''
+        if not user.is_authenticated:
+            return self
+        flags = {
+            'is_favorited': Favorite,
+            'is_in_shopping_cart': ShoppingCart,
+        }
+        return self.annotate(**{
+            flag: Exists(
+                model.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+            for flag, model in flags.items()
+            if fields is None or flag in fields
+        })
+
+
 class Recipe(models.Model):
     '''Модель рецепта.'''
 
@@ -108,6 +164,7 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(
         Tag,
+        through='RecipeTag',
         related_name='recipes',
         verbose_name='Название тега.'
     )
@@ -129,20 +186,86 @@ class Recipe(models.Model):
         db_index=True,
         verbose_name='Дата публикации.'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное.'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок.'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор.'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии фото.'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     def total_favorites(self):
         '''Метод для получения количества добавлений рецепта в избранное.'''
-        return self.favorites.count()
+        return self.favorites_count
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created',)
+        indexes = [
+            PostgresGinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_gin'
+            ),
+            PostgresGinIndex(
+                OpClass('name', name='gin_trgm_ops'),
+                name='recipe_name_trgm_gin'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
 
+class RecipeTag(models.Model):
+    '''Модель тега рецепта.
+
+    Таблица связи та же, что создавалась для ManyToManyField; индекс
+    (tag, recipe) нужен фильтру рецептов по тегам.
+    '''
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        verbose_name='Тег'
+    )
+
+    class Meta:
+        db_table = 'recipes_recipe_tags'
+        unique_together = ('recipe', 'tag')
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'],
+                name='recipe_tags_tag_recipe_idx'
+            )
+        ]
+        verbose_name = 'Тег рецепта'
+        verbose_name_plural = 'Теги рецептов'
+
+    def __str__(self) -> str:
+        return f'Тег {self.tag} рецепта {self.recipe}'
+
+
 class RecipeIngredient(models.Model):
     '''Модель ингредиета в рецепте.'''
     recipe = models.ForeignKey(
@@ -275,3 +398,66 @@ class ShoppingCart(models.Model):
 
     def __str__(self) -> str:
         return f'{self.recipe} добавлен в список покупок {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    '''Модель суммарного количества ингредиента в списке покупок.'''
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.DecimalField(
+        max_digits=LIMIT_DIGITS_AMOUNT_FIELD,
+        decimal_places=LIMIT_NUMBER_WIDTH,
+        verbose_name='Суммарное количество'
+    )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+    def __str__(self) -> str:
+        return f'{self.ingredient} в списке покупок {self.user}'
+
+
+class ShoppingListVersion(models.Model):
+    '''Модель версии списка покупок юзера.
+
+    Версия только увеличивается через INSERT ... ON CONFLICT при каждом
+    изменении списка и входит в ETag выгрузки. Хранится отдельно от
+    юзера, чтобы сохранение профиля не могло вернуть ее назад.
+    '''
+
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shopping_list_version',
+        verbose_name='Пользователь'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        verbose_name = 'Версия списка покупок'
+        verbose_name_plural = 'Версии списков покупок'
+
+    def __str__(self) -> str:
+        return f'Версия {self.version} списка покупок {self.user}'
@@ -0,0 +1,55 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .constants import SEARCH_CONFIG
+
+
+def is_postgresql():
+    '''Метод проверки, что БД поддерживает полнотекстовый поиск.'''
+    return connection.vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    '''Метод построения поискового вектора по названию и описанию.'''
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    '''Метод пересчета сохраненного поискового вектора рецептов.'''
+    if is_postgresql():
+        queryset.update(search_vector=recipe_search_vector())
+
+
+def search_recipes(queryset, value):
+    '''Метод поиска рецептов по названию и описанию с ранжированием.
+
+    В PostgreSQL используется сохраненный SearchVector с GIN индексом
+    и триграммный индекс по названию для поиска с опечатками. В других
+    БД поиск сводится к icontains, совпадения в названии идут первыми.
+    '''
+    if not is_postgresql():
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).annotate(
+            search_rank=Case(
+                When(name__icontains=value, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        ).order_by('-search_rank', '-created')
+
+    query = SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=value)
+    ).annotate(
+        search_rank=(
+            SearchRank(F('search_vector'), query)
+            + TrigramSimilarity('name', value)
+        )
+    ).order_by('-search_rank', '-created')
@@ -0,0 +1,158 @@
+from django.db import connections, router, transaction
+from django.db.models import Sum
+
+from .models import (
+    RecipeIngredient, ShoppingCart, ShoppingListItem, ShoppingListVersion
+)
+
+BATCH_SIZE = 1000
+
+
+def recipe_amounts(recipe_ids, sign=1):
+    '''Метод получения суммарных количеств ингредиентов рецептов.'''
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('ingredient_id').annotate(
+            amount=Sum('amount')
+        ).order_by()
+    }
+
+
+def upsert_items(connection, rows):
+    '''Метод прибавления количеств к строкам списков покупок.
+
+    rows - кортежи (user_id, ingredient_id, delta). Отсутствующие строки
+    создаются, существующие увеличиваются на delta в той же инструкции.
+    '''
+    quote = connection.ops.quote_name
+    opts = ShoppingListItem._meta
+    table = quote(opts.db_table)
+    columns = [
+        quote(opts.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount')
+    ]
+    sql = (
+        'INSERT INTO {table} ({user}, {ingredient}, {amount}) VALUES {values} '
+        'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+        'SET {amount} = {table}.{amount} + EXCLUDED.{amount}'
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.execute(sql.format(
+                table=table,
+                user=columns[0],
+                ingredient=columns[1],
+                amount=columns[2],
+                values=', '.join(['(%s, %s, %s)'] * len(batch)),
+            ), [value for row in batch for value in row])
+
+
+def bump_versions(user_ids):
+    '''Метод увеличения версий списков покупок юзеров.
+
+    Вызывается в транзакции изменения списков. Отсутствующие версии
+    создаются со значением 1, существующие увеличиваются в той же
+    инструкции, поэтому версия никогда не уменьшается.
+    '''
+    user_ids = sorted(set(user_ids))
+    connection = connections[router.db_for_write(ShoppingListVersion)]
+    quote = connection.ops.quote_name
+    opts = ShoppingListVersion._meta
+    table = quote(opts.db_table)
+    user = quote(opts.get_field('user').column)
+    version = quote(opts.get_field('version').column)
+    sql = (
+        'INSERT INTO {table} ({user}, {version}) VALUES {values} '
+        'ON CONFLICT ({user}) DO UPDATE '
+        'SET {version} = {table}.{version} + 1'
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            cursor.execute(sql.format(
+                table=table,
+                user=user,
+                version=version,
+                values=', '.join(['(%s, 1)'] * len(batch)),
+            ), batch)
+
+
+def apply_deltas(user_ids, deltas):
+    '''Метод изменения списков покупок юзеров на количества deltas.
+
+    deltas - словарь {ingredient_id: изменение количества}, одинаковый
+    для всех user_ids. Все изменения записываются через INSERT ...
+    ON CONFLICT (user_id, ingredient_id) DO UPDATE, поэтому конкурентные
+    изменения одной строки складываются, а не нарушают уникальность.
+    Обнулившиеся строки затем удаляются одним DELETE, версии списков
+    юзеров увеличиваются.
+    '''
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+
+    alias = router.db_for_write(ShoppingListItem)
+    with transaction.atomic(using=alias):
+        upsert_items(connections[alias], [
+            (user_id, ingredient_id, delta)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+        ])
+        decreased = [
+            ingredient_id for ingredient_id, delta in deltas.items()
+            if delta < 0
+        ]
+        if decreased:
+            ShoppingListItem.objects.filter(
+                user_id__in=user_ids,
+                ingredient_id__in=decreased,
+                total_amount__lte=0
+            ).delete()
+        bump_versions(user_ids)
+
+
+def apply_recipe_deltas(recipe, deltas):
+    '''Метод учета изменения ингредиентов рецепта в списках покупок.'''
+    apply_deltas(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'user_id', flat=True
+        ),
+        deltas
+    )
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    '''Метод полного пересчета списков покупок по корзинам.
+
+    Версии увеличиваются у всех юзеров, у которых список был или стал
+    непустым.
+    '''
+    with transaction.atomic():
+        user_ids = set(
+            ShoppingListItem.objects.values_list('user_id', flat=True)
+            .distinct()
+        )
+        ShoppingListItem.objects.all().delete()
+        rows = RecipeIngredient.objects.filter(
+            recipe__shopping_recipe__isnull=False
+        ).values_list(
+            'recipe__shopping_recipe__user_id', 'ingredient_id'
+        ).annotate(total_amount=Sum('amount')).order_by()
+        created = ShoppingListItem.objects.bulk_create((
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount
+            )
+            for user_id, ingredient_id, total_amount in rows.iterator()
+        ), batch_size=batch_size)
+        user_ids.update(item.user_id for item in created)
+        bump_versions(user_ids)
+    return len(created)
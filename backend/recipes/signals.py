@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from .counters import COUNTERS, change_counter
+from .images import delete_variants, run_in_background, schedule_variants
+from .models import Favorite, Recipe, ShoppingCart, Subscription
+from .search import update_search_vector
+from .shopping_list import apply_deltas, recipe_amounts
+
+# Справочник (sender - модель) загружен в обход сигналов моделей.
+catalog_loaded = Signal()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def increment_counter(sender, instance, created, **kwargs):
+    '''Увеличение счетчика при создании объекта.'''
+    if created:
+        _, field, _ = COUNTERS[sender]
+        change_counter(sender, [getattr(instance, field)], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def decrement_counter(sender, instance, **kwargs):
+    '''Уменьшение счетчика при удалении объекта.
+
+    Удаления через API идут мимо сигналов через delete_counted, здесь
+    учитываются каскадные удаления и удаления из админки.
+    '''
+    _, field, _ = COUNTERS[sender]
+    change_counter(sender, [getattr(instance, field)], -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    '''Добавление ингредиентов рецепта в список покупок юзера.'''
+    if created:
+        apply_deltas([instance.user_id], recipe_amounts([instance.recipe_id]))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    '''Вычитание ингредиентов рецепта из списка покупок юзера.
+
+    Срабатывает до удаления, пока ингредиенты рецепта еще доступны
+    при каскадном удалении рецепта.
+    '''
+    apply_deltas(
+        [instance.user_id], recipe_amounts([instance.recipe_id], sign=-1)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    '''Пересчет поискового вектора при изменении названия или описания.'''
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_vector(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_variants(sender, instance, update_fields=None, **kwargs):
+    '''Генерация уменьшенных копий фото после его загрузки.'''
+    if instance.image and (
+        update_fields is None or 'image' in update_fields
+    ):
+        schedule_variants(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_variants(sender, instance, **kwargs):
+    '''Удаление уменьшенных копий фото удаленного рецепта.'''
+    if instance.image_variants:
+        transaction.on_commit(lambda: run_in_background(
+            delete_variants, instance.image_variants
+        ))
@@ -25,6 +25,18 @@ class CustomUser(AbstractUser):
         max_length=LIMIT_MODEL_FIELD,
         verbose_name='Фамилия'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', ]
@@ -38,3 +50,22 @@ class CustomUser(AbstractUser):
     def __str__(self) -> str:
 
         return self.username
+
+    def save(self, *args, **kwargs):
+        '''Метод сохранения юзера без счетчиков.
+
+        Счетчики меняются только через F(), а экземпляр юзера может быть
+        устаревшим (например, взятым из кэша токенов), поэтому полное
+        сохранение существующей записи их не перезаписывает.
+        '''
+        if (
+            not args and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)